@@ -1,11 +1,61 @@
-from .color import * 
-from .helper import * 
-from .debug import * 
-from .optical import * 
-from .parameter import * 
-from .plot import * 
+from .color import *
+from .helper import *
+from .debug import *
+from .optical import *
+from .parameter import *
 from .signal_slot import *
 from .git_count import *
 from .xml_helper import *
 from .parser import *
 #~ from .aesPickle import loads, dumps
+
+#------------------- heavy subsystems are only imported on first use -------------------
+# plot pulls in matplotlib, sympy and numpy, its names are added as if "from .plot import *" was done here
+_lazy_star = ["plot"]
+_lazy_module = ["svg", "qt4", "qt5", "aesPickle"]
+_loaded = []
+
+def _load_star(name):
+    import importlib
+    mod = importlib.import_module("." + name, __name__) # sets the submodule as attribute, overwritten below
+    g = globals()
+    for k, v in vars(mod).items():
+        if k[0] != "_" and (k not in g or g[k] is mod):
+            g[k] = v
+
+def __getattr__(name):
+    if name in _lazy_module:
+        import importlib
+        return importlib.import_module("." + name, __name__)
+
+    if name[:2] == "__" and name != "__all__": # probes like __wrapped__ should not import anything
+        raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
+    
+    for s in _lazy_star:
+        if s not in _loaded:
+            _loaded.append(s)
+            _load_star(s)
+
+    if name == "__all__": # from addon import * gets everything, like before
+        return [k for k in globals().keys() if k[0] != "_"]
+    if name in globals():
+        return globals()[name]
+    raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
+
+def __dir__():
+    return sorted(set(globals().keys()) | set(_lazy_module) | set(_lazy_star))
+
+#------------------- plot stays the function -------------------
+import sys as _sys
+import types as _types
+
+class _package(_types.ModuleType):
+    """
+    The import system sets every imported subpackage as attribute of its parent. If plot (the subpackage) got imported first (i.e. import addon.plot.xml_parser), addon.plot would be the subpackage and __getattr__ never loads the star names. These attributes are dropped here, s.t. addon.plot is the function, like with the star import.
+    """
+    def __setattr__(self, name, val):
+        if name in _lazy_star and isinstance(val, _types.ModuleType):
+            return
+        super().__setattr__(name, val)
+
+_sys.modules[__name__].__class__ = _package
@@ -109,7 +109,7 @@ def create_folder(name):
         name = prior + f
         if not readable(name):
             if f not in ["", "."]:
-                os.system("mkdir {}".format(name))
+                os.makedirs(name, exist_ok = True) # another process might create it at the same time
                 CYAN("mkdir {}".format(name))
         prior += f + "/"
     
@@ -159,13 +159,7 @@ def to_number(obj, strip_quotes = True):
 
 def to_str(obj):
     if is_list(obj):
-        res = "["
-        for o in obj:
-            res += to_str(o)
-            if o != obj[-1]:
-                res += ","
-        res += "]"
-        return res
+        return "[" + ",".join([to_str(o) for o in obj]) + "]"
     elif is_dict(obj):
         return dict([(k, to_str(v)) for k, v in obj.items()])
     elif is_str(obj):
@@ -183,20 +177,78 @@ def make_list(obj):
 
 #------------------------ clean split for strings --------------------------------------------------
 def split_clean(string, strip_quotes = False):
+    """
+    Splits the string on whitespace sections that are not in "" or ''. Works on a list of strings as well (see split_clean_lines).
+    """
     if is_list(string):
-        return list(map(partial(split_clean, strip_quotes = strip_quotes), string))
+        return split_clean_lines(string, strip_quotes)
     
-    string = re.sub("^[\\s]+|[\\s]+$", "", string) # remove front and back whitespace (strip would also work)
-    not_in_quotes = '(?=(?:[^"\']*(?:"[^"]*"|\'[^\']*\'))*[^"\']*$)'
-    e = '\\s+'+not_in_quotes # split on whitespace sections but not in "" or ''
+    string = string.strip()
+    if '"' not in string and "'" not in string: # no quotes, nothing to protect
+        res = string.split() or [""]
+    else:
+        res = split_quoted(string)
     
-    res = re.split(e, string)
     if strip_quotes:
-        for i in range(len(res)):
-            res[i] = re.sub('^(["\'])([\s\S]*)(\\1)$', "\\2", res[i]) #strips "" or '' if found at ^ and $
-        return res
-    else:
-        return res
+        return [unquote(r) for r in res]
+    return res
+
+def split_clean_lines(lines, strip_quotes = False):
+    """
+    Batch version of split_clean, takes any iterable of strings (i.e. an open file) and returns a list with the split lines.
+    """
+    res = []
+    append = res.append
+    for l in lines:
+        if '"' in l or "'" in l or strip_quotes:
+            append(split_clean(l, strip_quotes))
+        else:
+            append(l.split() or [""])
+    return res
+
+def split_quoted(string):
+    """
+    Linear time splitting of a stripped string on whitespace sections where the rest of the string has balanced quotes (same as the lookahead regex (?=(?:[^"']*(?:"[^"]*"|'[^']*'))*[^"']*$) did).
+    """
+    n = len(string)
+    #------------------- balanced[i]: string[i:] consists of closed "" and '' sections -------------------
+    balanced = [False] * (n + 1)
+    balanced[n] = True
+    next_quote = {'"': n, "'": n}
+    for i in range(n - 1, -1, -1):
+        c = string[i]
+        if c == '"' or c == "'":
+            j = next_quote[c] # closing quote
+            balanced[i] = j < n and balanced[j + 1]
+            next_quote[c] = i
+        else:
+            balanced[i] = balanced[i + 1]
+    
+    #------------------- split on whitespace sections with balanced rest -------------------
+    res = []
+    start = 0
+    i = 0
+    while i < n:
+        if string[i].isspace():
+            j = i + 1
+            while string[j].isspace(): # string is stripped, so j < n
+                j += 1
+            if balanced[i]:
+                res.append(string[start:i])
+                start = j
+            i = j
+        else:
+            i += 1
+    res.append(string[start:])
+    return res
+
+def unquote(string):
+    """
+    Strips "" or '' if found at the start and the end of the string.
+    """
+    if len(string) > 1 and string[0] in "\"'" and string[-1] == string[0]:
+        return string[1:-1]
+    return string
 
 def sstr(obj, length = 50):
     sv = str(obj)
@@ -7,6 +7,8 @@
 
 from .parameter import *
 
+import time
+
 class parser():
     def __init__(self, grammar = None):
         self.core = namespace()
@@ -19,7 +21,36 @@ class parser():
         self.core.functions = grammar.functions
         self.core.match = grammar.match
         self.core.match_rest = grammar.match_rest
-
+        
+        self.core.regex = re.compile((self.core.match + "|[{0}]").format("".join(self.escape_regex(self.core.tokens))))
+        self.compile_table()
+    
+    def compile_table(self):
+        """
+        Compiles the grammar into lookup tables, indexed by the token on top of the stack. For each top token, shift[lookahead] holds the rules that would prefer to shift and reduce holds the fully matched rules, ordered by preference (longest rule, later rule if equal length).
+        """
+        rule = []
+        for k, val in self.core.rules.items():
+            for v in val:
+                rule.append(namespace({"pattern": v.split(" "), "token": k}))
+        self.core.rule = rule
+        
+        table = {}
+        for r, r_i in zipi(rule):
+            for t, idx in zipi(r.pattern):
+                if r.pattern.index(t) != idx: # matches() only considers the first occurrence
+                    continue
+                entry = table.setdefault(t, namespace({"shift": {}, "reduce": []}))
+                prefix = r.pattern[:idx]
+                if idx + 1 == len(r.pattern):
+                    entry.reduce.append((len(r.pattern), r_i, prefix, r))
+                else:
+                    entry.shift.setdefault(r.pattern[idx + 1], []).append(prefix)
+        
+        for entry in table.values():
+            entry.reduce = [(prefix, r) for n, r_i, prefix, r in sorted(entry.reduce, key = lambda x: (-x[0], -x[1]))]
+        
+        self.core.table = table
 
     def escape_regex(self, list_):
         escape = ["-", "\\", "]", "["]
@@ -32,7 +63,7 @@ class parser():
         return back
     
     def tokenize(self, expr):
-        split = re.findall((self.core.match + "|[{0}]").format("".join(self.escape_regex(self.core.tokens))), expr)
+        split = self.core.regex.findall(expr)
         token = [namespace({"token": self.core.tokens.get(x, self.core.match_rest), "value": x}) for x in split]
         return token
 
@@ -54,14 +85,63 @@ class parser():
         return False
 
     def parse(self, istring):
+        """
+        Table driven shift-reduce parse with the tables of compile_table. Gives the same result as parse_scan.
+        """
+        token = [(t.token, t.value) for t in self.tokenize(istring)]
+        token.append((None, None))
+        token.reverse() # pop from the back
+        
+        table = self.core.table
+        functions = self.core.functions
+        tstack = [] # tokens
+        vstack = [] # values
+        
+        def matches(prefix):
+            n = len(prefix)
+            return n < len(tstack) and (n == 0 or tstack[-1-n:-1] == prefix)
+        
+        while True:
+            #------------------- reduce if no rule prefers the lookahead -------------------
+            entry = table.get(tstack[-1], None) if tstack else None
+            if entry != None and not any(matches(prefix) for prefix in entry.shift.get(token[-1][0], [])):
+                for prefix, r in entry.reduce:
+                    if matches(prefix):
+                        n = len(r.pattern)
+                        val = functions[r.token](*vstack[-n:])
+                        del tstack[-n:]
+                        del vstack[-n:]
+                        tstack.append(r.token)
+                        vstack.append(val)
+                        break
+                else:
+                    entry = None
+                if entry != None:
+                    continue
+            
+            #------------------- accept -------------------
+            if len(token) == 1 and len(tstack) == 1:
+                break
+            #------------------- error -------------------
+            if len(token) == 1 and len(tstack) != 1:
+                ERROR("parse failed, this remained on the stack: {}".format(" ".join([x for x in tstack])))
+                break
+            
+            #------------------- shift -------------------
+            t, v = token.pop()
+            tstack.append(t)
+            vstack.append(v)
+        
+        return vstack[0]
+    
+    def parse_scan(self, istring):
+        """
+        Reference implementation of parse, that scans all rules at every step. Only kept to verify and benchmark parse.
+        """
         token = self.tokenize(istring)
         stack = []
+        rule = self.core.rule
         
-        rule = []
-        for k, val in self.core.rules.items():
-            for v in val:
-                rule.append(namespace({"pattern": v.split(" "), "token": k}))
-
         token.append(namespace({"token": None, "value": None}))
         lookahead = token[0]
 
@@ -124,3 +204,17 @@ class parser():
             lookahead = token[0]
             
         return stack[0].value
+    
+    def benchmark(self, istring, repeat = 100):
+        """
+        Compares parse against parse_scan on istring and prints the time per parse.
+        """
+        ASSERT(self.parse(istring) == self.parse_scan(istring), "parse and parse_scan disagree on {}".format(istring))
+        res = []
+        for fct in [self.parse_scan, self.parse]:
+            start = time.time()
+            for i in range(repeat):
+                fct(istring)
+            res.append((time.time() - start) / repeat)
+        GREEN("{greenb}{} tokens{green}: scan {:.3g}s, table {:.3g}s, speedup {greenb}{:.1f}x".format(len(self.tokenize(istring)), res[0], res[1], res[0] / res[1], **color))
+        return res
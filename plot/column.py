@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Author:  Mario S. Könz <mskoenz@gmx.net>
+# Date:    18.10.2026 11:02:15 CEST
+# File:    column.py
+
+from ..helper import *
+
+import json
+import zlib
+import base64
+import collections
+import collections.abc
+import numpy as np
+import xml.etree.ElementTree as xml
+
+def to_column(values):
+    """
+    Converts a list of to_number results into a typed numpy array. Only ints give an int64 column, ints and floats a float64 column and everything else (i.e. strings) an object column.
+    """
+    types = set(map(type, values))
+    if types <= set([int]):
+        try:
+            return np.array(values, dtype = np.int64)
+        except OverflowError: # python int too large for int64
+            pass
+    elif types <= set([int, float]):
+        return np.array(values, dtype = np.float64)
+
+    return np.fromiter(values, dtype = object, count = len(values)) # keeps lists as single objects
+
+def tokens_to_column(tokens):
+    """
+    Same as to_column(to_number(tokens)) for a column of split_clean tokens, but the whole column is converted at once with int, then float. Only if both fail (i.e. strings, lists or ints beyond int64) the tokens go through to_number one by one.
+    """
+    n = len(tokens)
+    try:
+        return np.fromiter(map(int, tokens), dtype = np.int64, count = n)
+    except OverflowError:
+        return to_column(to_number(list(tokens)))
+    except ValueError:
+        pass
+    try:
+        return np.fromiter(map(float, tokens), dtype = np.float64, count = n) # float(int(x)) == float(x) for mixed int/float columns
+    except ValueError:
+        return to_column(to_number(list(tokens)))
+
+def tokens_to_columns(label, rows):
+    """
+    Same as rows_to_columns(label, to_number(rows)) for rows of split_clean tokens.
+    """
+    return collections.OrderedDict(zip(label, map(tokens_to_column, zip(*rows))))
+
+def rows_to_columns(label, rows):
+    """
+    Transposes the rows (list of lists) into an OrderedDict label -> typed column. Like transpose, the columns are as long as the shortest row.
+    """
+    return collections.OrderedDict(zip(label, map(to_column, zip(*rows))))
+
+def columns_len(data):
+    """
+    Returns the number of rows of the columns in data.
+    """
+    for v in data.values():
+        return len(v)
+    return 0
+
+class column_view(collections.abc.Mapping):
+    """
+    Read only mapping label -> column[sel]. The selection is applied lazily on access and slicing numpy arrays gives views, so no data is copied.
+    """
+    def __init__(self, data, sel = slice(None)):
+        self.data = data
+        self.sel = sel
+
+    def __getitem__(self, key):
+        return self.data[key][self.sel]
+
+    def __iter__(self):
+        return iter(self.data)
+
+    def __len__(self):
+        return len(self.data)
+
+    def __contains__(self, key):
+        return key in self.data
+
+#------------------- binary column blocks in the xml data node -------------------
+valid_encodings = ["text", "base64", "zlib"]
+
+def encode_column(col, compression = False):
+    """
+    Returns (dtype, text) with the column packed as little endian bytes in base64 (zlib compressed if compression). Object columns are stored as json with the dtype "json".
+    """
+    if col.dtype == object:
+        dtype = "json"
+        raw = json.dumps(col.tolist()).encode("utf-8")
+    else:
+        dtype = col.dtype.newbyteorder("<").str
+        raw = np.ascontiguousarray(col, dtype = dtype).tobytes()
+    if compression:
+        raw = zlib.compress(raw)
+    return dtype, base64.b64encode(raw).decode("ascii")
+
+def decode_column(dtype, text, compression = False):
+    raw = base64.b64decode(text or "")
+    if compression:
+        raw = zlib.decompress(raw)
+    if dtype == "json":
+        return to_column(json.loads(raw.decode("utf-8")))
+    return np.frombuffer(raw, dtype = dtype)
+
+def append_block(Edata, columns):
+    """
+    Appends the columns (label -> column) as a block <b> to the data node, with one <c> per column. The encoding attribute of Edata decides on the compression.
+    """
+    compression = Edata.attrib.get("encoding") == "zlib"
+    Eb = xml.Element("b", {"rows": str(columns_len(columns))})
+    for l, col in columns.items():
+        dtype, text = encode_column(col, compression)
+        Ec = xml.Element("c", {"label": l, "dtype": dtype})
+        Ec.text = text
+        Eb.append(Ec)
+    Edata.append(Eb)
+
+def read_columns(Edata, label):
+    """
+    Reads the data node into an OrderedDict label -> column, for binary blocks as well as for text rows <d>.
+    """
+    encoding = Edata.attrib.get("encoding", "text")
+    if encoding == "text":
+        return tokens_to_columns(label, split_clean_lines(c.text for c in Edata.findall("d")))
+
+    compression = encoding == "zlib"
+    blocks = []
+    for Eb in Edata.findall("b"):
+        blocks.append(collections.OrderedDict((Ec.attrib["label"], decode_column(Ec.attrib["dtype"], Ec.text, compression)) for Ec in Eb.findall("c")))
+    return concat_columns(blocks, label)
+
+def concat_columns(blocks, label):
+    """
+    Joins the blocks (iterable of OrderedDict label -> column) into one OrderedDict label -> column. The blocks are consumed one by one, s.t. a generator of chunks is fine.
+    """
+    parts = collections.OrderedDict((l, []) for l in label)
+    for b in blocks:
+        for l, col in b.items():
+            parts.setdefault(l, []).append(col)
+
+    res = collections.OrderedDict()
+    for l, p in parts.items():
+        if len(p) == 1:
+            res[l] = p[0]
+        elif len(p) > 1:
+            res[l] = np.concatenate(p) # promotes i.e. int and float blocks to float
+    return res
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Author:  Mario S. Könz <mskoenz@gmx.net>
+# Date:    18.10.2026 15:20:06 CEST
+# File:    column_cache.py
+
+from ..helper import *
+
+from .disk_cache import *
+
+import os
+import shutil
+import pickle
+import hashlib
+import collections
+import numpy as np
+
+cache_dir = cache_path("columns")
+cache_size = 4000 # MB, the least recently used entries are evicted above
+cache_version = 2
+
+#------------------- location and validation -------------------
+def cache_folder(file_, p):
+    """
+    Returns the cache folder of file_. With cache_dir = local the cache is a sidecar .<file>.cache next to file_.
+    """
+    file_ = os.path.abspath(file_)
+    dir_ = p.get("cache_dir", cache_dir)
+    if dir_ == "local":
+        return os.path.join(path(file_), ".{}.cache".format(filename(file_)))
+    return os.path.join(os.path.expanduser(dir_), hashlib.sha1(file_.encode("utf-8")).hexdigest())
+
+def file_hash(file_, chunk = 1 << 22):
+    h = hashlib.blake2b(digest_size = 20)
+    with open(file_, "rb") as ifs:
+        for block in iter(lambda: ifs.read(chunk), b""):
+            h.update(block)
+    return h.hexdigest()
+
+def stamp(file_):
+    st = os.stat(file_)
+    return st.st_size, st.st_mtime_ns
+
+def read_meta(folder):
+    try:
+        with open(os.path.join(folder, "meta.pkl"), "rb") as ifs:
+            meta = pickle.load(ifs)
+    except Exception: # missing or broken cache
+        return None
+    if meta.get("version") != cache_version:
+        return None
+    return meta
+
+def write_meta(folder, meta):
+    with atomic_file(os.path.join(folder, "meta.pkl")) as ofs:
+        pickle.dump(meta, ofs, protocol = pickle.HIGHEST_PROTOCOL)
+
+def is_valid(file_, folder, meta):
+    """
+    Checks size and mtime of file_, if only the mtime changed the content hash decides.
+    """
+    size, mtime = stamp(file_)
+    if size != meta["size"]:
+        return False
+    if mtime == meta["mtime"]:
+        return True
+    if meta["hash"] != None and file_hash(file_) == meta["hash"]: # i.e. touched or copied
+        meta["mtime"] = mtime
+        write_meta(folder, meta)
+        return True
+    return False
+
+#------------------- load / store -------------------
+def load_cached(file_, folder, comment = None):
+    """
+    Returns a namespace with label, param, source, plot_option and the memory mapped data of file_ from the cache in folder or None if there is no valid cache. comment is the comment setting the columns were parsed with (None for xml files), an entry of another comment is not valid.
+    """
+    meta = read_meta(folder)
+    if meta == None or meta.get("comment") != comment or not is_valid(file_, folder, meta):
+        return None
+
+    data = collections.OrderedDict()
+    try:
+        for l, fname, obj in meta["columns"]:
+            data[l] = np.load(os.path.join(folder, fname), mmap_mode = None if obj else "r", allow_pickle = obj)
+    except Exception:
+        return None
+
+    os.utime(os.path.join(folder, "meta.pkl")) # marks the entry as recently used
+    return namespace({"label": meta["label"], "param": meta["param"], "source": meta["source"], "plot_option": meta["plot_option"], "data": data})
+
+def store_cached(file_, nsx, folder, max_mb = None, comment = None):
+    """
+    Stores label, param, source, plot_option and data (one .npy per column) of nsx in the cache folder of file_, parsed with comment (see load_cached). If max_mb is given, the other entries next to folder are evicted down to max_mb.
+    """
+    size, mtime = stamp(file_)
+    meta = {"version": cache_version, "size": size, "mtime": mtime, "hash": file_hash(file_), "comment": comment
+          , "label": nsx.label, "param": nsx.param, "source": nsx.source, "plot_option": nsx.plot_option, "columns": []}
+    try:
+        if os.path.isdir(folder):
+            shutil.rmtree(folder)
+        os.makedirs(folder)
+        for l, l_i in zipi(list(nsx.data.keys())):
+            col = nsx.data[l]
+            obj = col.dtype == object
+            fname = "{}.npy".format(l_i)
+            np.save(os.path.join(folder, fname), col, allow_pickle = obj)
+            meta["columns"].append((l, fname, obj))
+        if stamp(file_) != (size, mtime): # changed while we were reading/hashing it
+            shutil.rmtree(folder, ignore_errors = True)
+            return
+        write_meta(folder, meta)
+    except OSError as e:
+        WARNING("could not write column cache for {}: {}".format(file_, e))
+        shutil.rmtree(folder, ignore_errors = True)
+        return
+
+    if max_mb != None:
+        evict(path(folder), max_mb * 1e6)
+
+def restamp(file_, folder, before):
+    """
+    Called after we changed file_ without touching its data (i.e. saving plot_option), s.t. the cache in folder stays valid. before is the stamp of file_ before our write, if the cache did not match it (someone else changed file_ in the meantime) the entry is dropped.
+    """
+    meta = read_meta(folder)
+    if meta == None:
+        return
+    if before != (meta["size"], meta["mtime"]):
+        shutil.rmtree(folder, ignore_errors = True)
+        return
+    meta["size"], meta["mtime"] = stamp(file_)
+    meta["hash"] = None # content changed, only the new size/mtime is trusted
+    write_meta(folder, meta)
+
+def evict(dir_, max_bytes):
+    """
+    Removes the least recently used entries in dir_ until the total size is below max_bytes.
+    """
+    def usage(folder):
+        return os.path.getmtime(os.path.join(folder, "meta.pkl")), sum(os.path.getsize(os.path.join(folder, f)) for f in os.listdir(folder))
+    evict_lru(dir_, max_bytes, usage, lambda folder: shutil.rmtree(folder, ignore_errors = True))
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Author:  Mario S. Könz <mskoenz@gmx.net>
+# Date:    19.10.2026 10:02:45 CEST
+# File:    disk_cache.py
+
+from ..helper import *
+
+import os
+import shutil
+import contextlib
+
+def cache_path(*names):
+    """
+    Path below the addon folder in the user cache ($XDG_CACHE_HOME or ~/.cache).
+    """
+    return os.path.join(os.environ.get("XDG_CACHE_HOME", os.path.expanduser("~/.cache")), "addon", *names)
+
+def tmp_name(file_):
+    return "{}.{}.tmp".format(file_, os.getpid())
+
+@contextlib.contextmanager
+def atomic_file(file_, mode = "wb"):
+    """
+    Opens a temporary file next to file_ that replaces file_ (keeping its permissions) when the block ends, s.t. other processes see the old or the new file, never a partial one. If the block raises, the temporary file is removed and file_ stays as it was.
+    """
+    tmp = tmp_name(file_)
+    try:
+        with open(tmp, mode) as ofs:
+            yield ofs
+        if os.path.exists(file_):
+            shutil.copymode(file_, tmp)
+        os.replace(tmp, file_)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+def evict_lru(dir_, max_bytes, usage, remove):
+    """
+    Removes the least recently used entries of dir_ until their total size is below max_bytes. usage(entry) returns (last use, size) and raises OSError for entries that are incomplete or removed by someone else right now (those are skipped), remove(entry) deletes one.
+    """
+    entries = []
+    total = 0
+    for e in os.listdir(dir_):
+        e = os.path.join(dir_, e)
+        try:
+            used, size = usage(e)
+        except OSError:
+            continue
+        entries.append((used, size, e))
+        total += size
+
+    for used, size, e in sorted(entries):
+        if total <= max_bytes:
+            break
+        remove(e)
+        total -= size
@@ -7,15 +7,22 @@
 
 from . import plot_grammar as grammar
 from . import matrix_generator as gen
+from . import forward_mode as fm
+from .expression_cache import *
+from .column import *
 from ..parser import *
 
-import sympy as sy
+import importlib.util
 import numpy as np
 
+expr_parser = parser(grammar) # compiles the grammar tables only once
+
 def math_parser(expr):
-    p = parser(grammar)
+    res = expr_cache.get("parse", expr)
+    if res != None:
+        return res
     
-    res = p.parse(expr)
+    res = expr_parser.parse(expr)
     
     def join_list(list_):
         if is_list(list_):
@@ -41,105 +48,219 @@ def math_parser(expr):
     
     res = "FCT('"+join_list(res)+"')"
 
-    return res
+    return expr_cache.set("parse", expr, res)
     
-def identify_symbols(string):
-    #------------------- get symbols -------------------
-    sym = list(set(re.findall("[A-Za-z_][\d\w]*(?=[ ]*(?:[+\-*/\)]|$))", string)))
+def expr_symbols(string):
+    """
+    Returns the sorted labels string depends on (function names are followed by a bracket).
+    """
+    return sorted(set(re.findall("[A-Za-z_][\d\w]*(?=[ ]*(?:[+\-*/\)]|$))", string)))
+
+def identify_symbols(string, errs = None):
+    """
+    Returns the sympy namespace, value and gaussian error of string. Only the symbols in errs (all if None) carry an error, derivatives are only taken for those.
+    """
+    import sympy as sy # only needed on a cache miss
     
     #------------------- create symbols -------------------
+    sym = expr_symbols(string)
+    errs = sym if errs == None else errs
     ns = namespace()
     for v in sym:
         ns[v] = sy.symbols(v, real=True)
+    for v in errs:
         ns[v + "_err"] = sy.symbols(v + "_err", positive=True)
     
     expr = eval(string, merge_dict(sy.__dict__, globals()), ns)
     
-    #------------------- get derivations for all symbols -------------------
-    diff = []
-    for s in sym:
-        diff.append(sy.diff(expr, ns[s]))
-    
     #------------------- calc gaussian error propagation -------------------
     res = 0
-    for d, s in zip(diff, sym):
-        res += d**2 * ns[s + "_err"]**2
+    for s in errs:
+        res += sy.diff(expr, ns[s])**2 * ns[s + "_err"]**2
     
     val = expr
     err = sy.sqrt(res)
     
     return ns, val, err
 
-def calc_expr(label, data0, expr):
-    temp_data = {}
-    data = {}
-    for l, d in zip(label, data0):
-        data[l] = d
+def expr_source(ns, keys, expr):
+    """
+    Returns the source of a lambda that evaluates the sympy expr on numpy columns (see source_namespace). The arguments are renamed, s.t. any label is a valid argument. Expressions the printer does not support are evaluated row by row with evalf.
+    """
+    import sympy as sy
+    from sympy.printing.numpy import NumPyPrinter, SciPyPrinter
+    from sympy.printing.codeprinter import PrintMethodNotImplementedError
+    
+    arg = ["_{}".format(i) for i in range(len(keys))]
+    expr = sy.sympify(expr).xreplace(dict((ns[k], sy.Symbol(a, **ns[k].assumptions0)) for k, a in zip(keys, arg)))
+    printer = SciPyPrinter if have_scipy else NumPyPrinter
+    try:
+        return "lambda {}: {}".format(", ".join(arg), printer().doprint(expr))
+    except PrintMethodNotImplementedError: # e.g. DiracDelta or besselj without scipy
+        return "evalf_fct({!r}, {!r})".format(arg, sy.srepr(expr))
+
+def compile_expr(instring):
+    """
+    Returns the names of the arguments (in order) and the compiled value function of instring, that acts on whole columns. Uses the expression cache and only needs sympy if instring is not cached.
+    """
+    res = expr_cache.get("fct", instring)
+    if res == None:
+        ns, val, err = identify_symbols(instring, [])
+        keys = expr_symbols(instring)
+        res = expr_cache.set("fct", instring, [keys, expr_source(ns, keys, val)])
+    
+    keys, val = res
+    return keys, expr_cache.compile(val)
+
+def compile_error(instring, errs):
+    """
+    Same as compile_expr for the propagated error of instring, if only the symbols in errs carry an error.
+    """
+    key = "{} ; {}".format(instring, " ".join(errs))
+    res = expr_cache.get("err", key)
+    if res == None:
+        ns, val, err = identify_symbols(instring, errs)
+        keys = sorted(ns.keys())
+        res = expr_cache.set("err", key, [keys, expr_source(ns, keys, err)])
+    
+    keys, err = res
+    return keys, expr_cache.compile(err)
+
+def expr_memo():
+    """
+    Shared state of calc_expr calls on the same data (i.e. all series of one plot with the same selection): the converted columns and the temporaries of the FCT and MPM nodes, named by their content, s.t. equal (sub)expressions are only evaluated once.
+    """
+    return namespace({"column": {}, "temp": {}, "node": {}})
+
+valid_backends = ["sympy", "dual"]
+default_backend = "sympy" if importlib.util.find_spec("sympy") != None else "dual"
+chunk_size = 1 << 14 # rows per chunk of the FCT evaluation, the temporaries of a chunk stay in the cache
+
+def calc_expr(data0, expr, memo = None, backend = None, chunk = None):
+    """
+    Evaluates expr on the columns in data0 (label -> column) and returns the value and the propagated error (None if zero). Calls with the same memo (see expr_memo) on the same data share their temporaries.
     
-    N = len(data[list(data.keys())[0]])
+    Errors are only propagated from labels with an _err column: the error of a temporary is None (absent) if none of its inputs carries one, and only the derivatives for the inputs with errors are taken. Without any error columns the error path is skipped entirely.
     
-    #------------------- add 0-colums to all labels that don't have an error -------------------
-    zero = [0 for n in range(N)]
-    add = []
-    for l in data.keys():
-        if "_err" not in l:
-            if l + "_err" not in data.keys():
-                add.append((l + "_err", zero))
+    The backend sympy differentiates symbolically and compiles the results, dual (see forward_mode) evaluates with dual numbers and does not need sympy. Default is sympy if it is installed.
     
-    for k, v in add:
-        data[k] = v
+    The FCT nodes are evaluated in chunks of chunk (default chunk_size) rows into their result columns, i.e. the intermediate arrays of an expression only have chunk rows. Only the results of the nodes are full columns (for an expression without @ just the value and the error).
+    """
+    backend = backend or default_backend
+    if backend not in valid_backends:
+        ERROR("backend {} not in {}".format(backend, valid_backends))
+    chunk = chunk or chunk_size
+    if memo == None:
+        memo = expr_memo()
+    temp_data = memo.temp
+    column = memo.column
+    N = columns_len(data0)
     
+    #------------------- columns are selected once and converted to float per chunk -------------------
+    def get_column(lbl):
+        if lbl in temp_data:
+            return temp_data[lbl]
+        if lbl not in column:
+            if lbl not in data0:
+                ERROR("label {} not found in the data".format(lbl))
+            column[lbl] = np.asarray(data0[lbl]) # no copy for views
+        return column[lbl]
+    
+    def get_chunk(lbl, sl):
+        return np.asarray(get_column(lbl)[sl], dtype = float)
+    
+    def has_err(lbl):
+        if lbl in temp_data:
+            return temp_data[lbl + "_err"] is not None
+        return lbl + "_err" in data0
+    
+    def chunks():
+        return [slice(i, i + chunk) for i in range(0, N, chunk)]
+    
+    def chunked(fct, keys):
+        res = np.empty(N)
+        for sl in chunks():
+            res[sl] = fct(*[get_chunk(k, sl) for k in keys]) # broadcasts constant expressions
+        return res
+    
+    def new_temp(key, calc):
+        """
+        Label of the node key, the value and the error are only calculated (calc()) if the node is new.
+        """
+        if key not in memo.node:
+            lbl = "__temp_{}".format(len(memo.node))
+            temp_data[lbl], temp_data[lbl+"_err"] = calc()
+            memo.node[key] = lbl
+        return memo.node[key]
     
     def MPM(mat_name, symbol, *args):
-        M = gen.matrix[mat_name](*args)
+        def calc():
+            M = gen.matrix[mat_name](*args) # acts on the whole column
+            err = gen.error_transform(M, get_chunk(symbol + "_err", slice(None))) if has_err(symbol) else None
+            return M(get_chunk(symbol, slice(None))), err
         
-        def transform(lbl, error = False):
-            d_all = merge_dict(data, temp_data)[lbl]
-            if error:
-                return np.sqrt(M(np.square(d_all)))
-            else:
-                return M(d_all)
-        
-        lbl = "__temp_{}".format(len(temp_data.keys()))
-        temp_data[lbl] = transform(symbol)
-        temp_data[lbl+"_err"] = transform(symbol + "_err", error = True)
-        return lbl
+        return new_temp(("MPM", mat_name, symbol, repr(args)), calc)
     
     def FCT(instring):
-        var, val, err = identify_symbols(instring)
+        def calc_dual():
+            val = np.empty(N)
+            err = None
+            for sl in chunks():
+                def lookup(lbl):
+                    if lbl not in temp_data and lbl not in data0:
+                        return None
+                    return get_chunk(lbl, sl), get_chunk(lbl + "_err", sl) if has_err(lbl) else None
+                
+                v, e = fm.eval_dual(instring, lookup)
+                val[sl] = v
+                if e is not None:
+                    if err is None:
+                        err = np.zeros(N)
+                    err[sl] = e
+            return val, err
         
-        def transform(var, expr0):
-            res = []
-            for i in range(N):
-                val = expr0
-                for v in var.keys():
-                    d = merge_dict(data, temp_data).get(v, None)
-                    if d != None:
-                        d = d[i]
-                    val = val.subs(var[v], d)
-                    
-                res.append(float(val.evalf()))
-            return res
+        def calc():
+            with np.errstate(all = "ignore"): # same nan/inf as the symbolic evaluation
+                if backend == "dual":
+                    return calc_dual()
+                
+                val = chunked(*reversed(compile_expr(instring)))
+                errs = [k for k in expr_symbols(instring) if has_err(k)]
+                if not errs:
+                    return val, None
+                return val, chunked(*reversed(compile_error(instring, errs)))
         
-        lbl = "__temp_{}".format(len(temp_data.keys()))
-        temp_data[lbl] = transform(var, val)
-        temp_data[lbl+"_err"] = transform(var, err)
-        return lbl
+        return new_temp(("FCT", instring), calc)
     
     
     target = math_parser(expr)
     target = eval(target, globals(), locals())
     val = temp_data[target]
     err = temp_data[target+"_err"]
+    expr_cache.save()
     
     #------------------- avoid error plotting if zero -------------------
-    all_zero = True
-    for e in err:
-        if e != 0:
-            all_zero = False
-            break
-    
-    if all_zero:
+    if err is not None and not np.any(err):
         err = None
     
     return val, err
+
+#------------------- benchmark -------------------
+def benchmark_chunks(n = 10**7, expr = "a*b + sin(c)/a", chunks = [None, 1 << 12, 1 << 14, 1 << 16, 1 << 18], backend = None):
+    """
+    Evaluates expr on n random rows (a and b with errors) with the chunk sizes in chunks (None is one chunk, i.e. whole columns) and prints the time and the peak of the allocated memory.
+    """
+    import time
+    import tracemalloc
+    
+    rng = np.random.default_rng(0)
+    data = dict((l, rng.random(n) + .5) for l in ["a", "b", "c", "a_err", "b_err"])
+    calc_expr(data, expr, backend = backend, chunk = 1 << 10) # compiles outside of the measurement
+    for c in chunks:
+        tracemalloc.start()
+        t = time.time()
+        calc_expr(data, expr, backend = backend, chunk = c or n)
+        t = time.time() - t
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        GREEN("chunk {greenb}{:>9}{green}: {greenb}{:.3f}s{green}, peak {greenb}{:.0f} MB".format(c or n, t, peak / 1e6, **color))
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Author:  Mario S. Könz <mskoenz@gmx.net>
+# Date:    18.10.2026 10:12:40 CEST
+# File:    expression_cache.py
+
+from ..helper import *
+
+from .disk_cache import *
+
+import os
+import math
+import pickle
+import functools
+import collections
+import importlib.util
+import numpy as np
+
+cache_file = cache_path("expr_cache.pkl")
+cache_version = 3
+have_scipy = importlib.util.find_spec("scipy") != None # the compiled sources use scipy.special if it is installed
+
+#------------------- namespace of the compiled sources -------------------
+def elementwise(f):
+    """
+    Vectorizes the scalar function f, arguments outside of its domain give nan.
+    """
+    def scalar(*args):
+        try:
+            return f(*args)
+        except (ValueError, OverflowError):
+            return np.nan
+    return np.vectorize(scalar, otypes = [float])
+
+class elementwise_module():
+    """
+    Module whose functions act elementwise on numpy columns, for the math functions the numpy printer emits (math.gamma, math.erf, ...).
+    """
+    def __init__(self, module, **replace):
+        self.module = module
+        self.replace = replace
+    
+    def __getattr__(self, name):
+        res = self.replace.get(name, getattr(self.module, name))
+        if callable(res):
+            res = elementwise(res)
+        setattr(self, name, res)
+        return res
+
+def evalf_fct(args, src):
+    """
+    Fallback for expressions that no printer supports (e.g. DiracDelta): evaluates the sympy expression src (srepr) row by row with evalf, like the original evaluation. args are the names of the arguments.
+    """
+    import sympy as sy
+    
+    expr = sy.sympify(src)
+    sym = dict((s.name, s) for s in expr.free_symbols)
+    
+    def row(*x):
+        try:
+            return float(expr.subs(dict((sym[a], v) for a, v in zip(args, x) if a in sym)).evalf())
+        except TypeError: # not a real number, e.g. DiracDelta(0)
+            return np.nan
+    
+    vec = np.vectorize(row, otypes = [float])
+    return lambda *x: vec(*x) if x else row()
+
+def source_namespace():
+    """
+    Everything the sources of expr_source can refer to.
+    """
+    ns = {"numpy": np
+        , "functools": functools
+        , "math": elementwise_module(math, factorial = lambda x: math.gamma(x + 1)) # sympy factorial of floats is gamma(x + 1)
+        , "evalf_fct": evalf_fct}
+    if have_scipy:
+        import scipy.special
+        import scipy.constants
+        ns["scipy"] = scipy
+    return ns
+
+def normalize_expr(expr):
+    """
+    Collapses all whitespace sections, s.t. "a * b" and " a *  b" share one cache entry.
+    """
+    return " ".join(expr.split())
+
+class expr_cache_class():
+    """
+    LRU cache for parsed and compiled plot expressions. Only plain data (strings and lists) is stored, the compiled functions are recreated from their source, s.t. the cache can be pickled to disk and a hit never needs sympy.
+    """
+    def __init__(self, file_ = cache_file, max_size = 512):
+        self.file_ = file_
+        self.max_size = max_size
+        self.entries = collections.OrderedDict()
+        self.compiled = {}
+        self.namespace = None
+        self.loaded = False
+        self.dirty = False
+
+    def load(self):
+        self.loaded = True
+        if self.file_ == None or not readable(self.file_):
+            return
+        try:
+            with open(self.file_, "rb") as ifs:
+                version, entries = pickle.load(ifs)
+        except Exception: # a broken cache is just an empty one
+            return
+        if version == (cache_version, have_scipy):
+            entries.update(self.entries)
+            self.entries = entries
+
+    def save(self):
+        if not self.dirty or self.file_ == None:
+            return
+        os.makedirs(path(self.file_), exist_ok = True)
+        try:
+            with atomic_file(self.file_) as ofs: # other processes see the old or the new cache
+                pickle.dump(((cache_version, have_scipy), self.entries), ofs, protocol = pickle.HIGHEST_PROTOCOL)
+            self.dirty = False
+        except OSError:
+            WARNING("could not write expression cache {}".format(self.file_))
+
+    def get(self, kind, expr):
+        if not self.loaded:
+            self.load()
+        key = (kind, normalize_expr(expr))
+        if key not in self.entries:
+            return None
+        self.entries.move_to_end(key)
+        return self.entries[key]
+
+    def set(self, kind, expr, val):
+        key = (kind, normalize_expr(expr))
+        self.entries[key] = val
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last = False)
+        self.dirty = True
+        return val
+
+    def compile(self, src):
+        """
+        Returns the function for the source src of a lambda expression (see source_namespace).
+        """
+        if src not in self.compiled:
+            if len(self.compiled) > 2 * self.max_size:
+                self.compiled.clear()
+            if self.namespace == None:
+                self.namespace = source_namespace()
+            self.compiled[src] = eval(src, dict(self.namespace))
+        return self.compiled[src]
+
+    def clear(self):
+        self.entries.clear()
+        self.compiled.clear()
+        self.dirty = True
+
+expr_cache = expr_cache_class()
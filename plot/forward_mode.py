@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Author:  Mario S. Könz <mskoenz@gmx.net>
+# Date:    18.10.2026 20:41:09 CEST
+# File:    forward_mode.py
+
+"""
+Sympy free evaluation of the FCT expressions: the expression is evaluated directly on numpy columns, the labels with errors are dual numbers that carry their derivatives along (forward mode). The gaussian error follows from the derivatives at the end.
+"""
+
+from ..helper import *
+
+import functools
+import numpy as np
+
+class dual():
+    """
+    Value (column or number) with its derivatives der (label -> column or number) w.r.t. the labels that carry an error.
+    """
+    __array_ufunc__ = None # numpy defers to our reflected operators, i.e. array + dual -> dual.__radd__
+
+    def __init__(self, val, der):
+        self.val = val
+        self.der = der
+
+    def __add__(self, other):
+        return chain(value(self) + value(other), [(self, lambda: 1), (other, lambda: 1)])
+    __radd__ = __add__
+
+    def __sub__(self, other):
+        return chain(value(self) - value(other), [(self, lambda: 1), (other, lambda: -1)])
+
+    def __rsub__(self, other):
+        return chain(value(other) - value(self), [(other, lambda: 1), (self, lambda: -1)])
+
+    def __mul__(self, other):
+        return chain(value(self) * value(other), [(self, lambda: value(other)), (other, lambda: value(self))])
+    __rmul__ = __mul__
+
+    def __truediv__(self, other):
+        return divide(self, other)
+
+    def __rtruediv__(self, other):
+        return divide(other, self)
+
+    def __pow__(self, other):
+        return power(self, other)
+
+    def __rpow__(self, other):
+        return power(other, self)
+
+    def __neg__(self):
+        return chain(-self.val, [(self, lambda: -1)])
+
+    def __pos__(self):
+        return self
+
+    def __abs__(self):
+        return chain(np.abs(self.val), [(self, lambda: np.sign(self.val))])
+
+def value(x):
+    return x.val if isinstance(x, dual) else x
+
+def chain(val, terms):
+    """
+    Returns the dual val with the derivatives sum(dfdx * x.der) over the terms (x, dfdx). dfdx is a function and only called if x has derivatives.
+    """
+    der = {}
+    for x, dfdx in terms:
+        if isinstance(x, dual) and x.der:
+            f = dfdx()
+            for k, d in x.der.items():
+                der[k] = der[k] + f * d if k in der else f * d
+    return dual(val, der)
+
+def divide(a, b):
+    val = value(a) / value(b)
+    return chain(val, [(a, lambda: 1 / value(b)), (b, lambda: -val / value(b))])
+
+def power(a, b):
+    val = value(a) ** value(b)
+    return chain(val, [(a, lambda: value(b) * value(a) ** (value(b) - 1)), (b, lambda: val * np.log(value(a)))])
+
+#------------------- functions (sympy names) -------------------
+def unary(f, dfdx):
+    def fct(x):
+        if not isinstance(x, dual):
+            return f(x)
+        return chain(f(x.val), [(x, lambda: dfdx(x.val))])
+    return fct
+
+def atan2(y, x):
+    r2 = lambda: value(x)**2 + value(y)**2
+    return chain(np.arctan2(value(y), value(x)), [(y, lambda: value(x) / r2()), (x, lambda: -value(y) / r2())])
+
+def log(x, base = None):
+    res = unary(np.log, lambda v: 1 / v)(x)
+    return res if base == None else res / log(base)
+
+functions = {
+      "sin": unary(np.sin, np.cos)
+    , "cos": unary(np.cos, lambda v: -np.sin(v))
+    , "tan": unary(np.tan, lambda v: 1 / np.cos(v)**2)
+    , "asin": unary(np.arcsin, lambda v: 1 / np.sqrt(1 - v**2))
+    , "acos": unary(np.arccos, lambda v: -1 / np.sqrt(1 - v**2))
+    , "atan": unary(np.arctan, lambda v: 1 / (1 + v**2))
+    , "sinh": unary(np.sinh, np.cosh)
+    , "cosh": unary(np.cosh, np.sinh)
+    , "tanh": unary(np.tanh, lambda v: 1 / np.cosh(v)**2)
+    , "asinh": unary(np.arcsinh, lambda v: 1 / np.sqrt(v**2 + 1))
+    , "acosh": unary(np.arccosh, lambda v: 1 / np.sqrt(v**2 - 1))
+    , "atanh": unary(np.arctanh, lambda v: 1 / (1 - v**2))
+    , "exp": unary(np.exp, np.exp)
+    , "log": log
+    , "ln": log
+    , "sqrt": unary(np.sqrt, lambda v: .5 / np.sqrt(v))
+    , "Abs": abs
+    , "abs": abs
+    , "sign": unary(np.sign, lambda v: 0)
+    , "floor": unary(np.floor, lambda v: 0)
+    , "ceiling": unary(np.ceil, lambda v: 0)
+    , "atan2": atan2
+    , "pi": np.pi
+    , "E": np.e
+    , "__builtins__": {}
+    }
+
+#------------------- evaluation -------------------
+@functools.lru_cache(maxsize = 512)
+def compile_dual(instring):
+    return compile(instring, "<expr>", "eval")
+
+class symbol_lookup():
+    """
+    Mapping for eval: names that lookup(name) knows (as (column, error column or None)) are columns or duals, all other names fall through to the functions.
+    """
+    def __init__(self, lookup):
+        self.lookup = lookup
+
+    def __getitem__(self, name):
+        res = self.lookup(name)
+        if res == None:
+            raise KeyError(name)
+        col, err = res
+        return col if err is None else dual(col, {name: 1.})
+
+def eval_dual(instring, lookup):
+    """
+    Returns the value and the gaussian error (None if no input carries an error) of instring. lookup(name) returns (column, error column or None) for the labels and None for everything else.
+    """
+    errors = {}
+    def lookup_err(name):
+        res = lookup(name)
+        if res != None and res[1] is not None:
+            errors[name] = res[1]
+        return res
+
+    try:
+        res = eval(compile_dual(instring), functions, symbol_lookup(lookup_err))
+    except NameError as e:
+        ERROR("{} in {}, the dual backend only knows the labels and {} (use -backend sympy for others)".format(e, instring, ", ".join(sorted(k for k in functions if k[0] != "_"))))
+
+    if not isinstance(res, dual):
+        return res, None
+    if not res.der:
+        return res.val, None
+
+    sq = 0
+    for k, d in res.der.items():
+        sq = sq + np.square(d * errors[k])
+    return res.val, np.sqrt(sq)
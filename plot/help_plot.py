@@ -13,13 +13,25 @@ def print_help(p):
     sd = {}
     # special
     sd["l"] =      "flag:  show all labels"
-    sd["update"] = "flag:  reloads the txt file specified in 'source' into this xml"
-    sd["conv"] =   "param: convert all .txt files in 'arg' to .xml files with same name but in folder 'conv'"
+    sd["update"] = "flag:  reloads the txt file specified in 'source' into this xml, only rows appended since the last conv/update are read if the rest of the txt did not change"
+    sd["conv"] =   "param: convert all .txt files in 'arg' to .xml files with same name but in folder 'conv'. Skips files where the .xml is newer than the .txt"
     sd["cp_opt"] = "param: [isel, osel], copy the plot_option::opt node 'isel' from the 'arg[0]' xml-file to each xml-file in 'arg[1:]' to position 'osel'"
-    sd["isel"]   = "param: from plot_options use the opt node number 'isel'. Default is 0 if one file in 'arg', 1 otherwise"
+    sd["isel"]   = "param: from plot_options use the opt node number 'isel'. Default is 0 if one file in 'arg', 1 otherwise. With 'all' or a list all these opt nodes are plotted in one pass (each one saved to its own position, with 'parallel' per file, not with 'watch')"
     sd["osel"]   = "param: save the options to the opt node number 'osel' in plot_options. Will create new opt nodes is neccessary"
     sd["conf"]   = "flag/param: shows the selected ('isel') options. If used as parameter, it will only show the option for the 'conf', i.e. 'conf' = 'x'"
     sd["parallel"]= "flag: treat multiple files parallel as single files"
+    sd["encoding"] = "param: text, base64 or zlib. How 'conv' and 'update' store the data, base64/zlib are binary (compressed) columns. Default is text or the encoding of the existing .xml"
+    sd["nocache"] = "flag:  do not use (and do not write) the column cache, parse the files again"
+    sd["norender"] = "flag:  do not use (and do not write) the render cache, render every figure again"
+    sd["render_dir"] = "param: folder of the render cache. A figure is only rendered if its data, options or rc settings changed, otherwise it is kept or copied from the cache. Default is ~/.cache/addon/render"
+    sd["render_size"] = "param: size of the render cache in MB, least recently used figures are evicted. Default is 1000"
+    sd["cache_dir"] = "param: folder of the column cache, 'local' puts a .<file>.cache folder next to each file. Default is ~/.cache/addon/columns"
+    sd["cache_size"] = "param: size of the column cache in MB, least recently used files are evicted. Default is 4000"
+    sd["jobs"]   = "param: number of processes used for 'parallel', 'conv' and to parse large txt files in chunks. Default is 1"
+    sd["watch"]  = "flag:  keep running and plot again whenever a file (or the source txt of an xml) changes. Only appended rows are parsed, with 'parallel' only changed files are plotted again (in this process, 'jobs' is not used)"
+    sd["watch_interval"] = "param: seconds between polls of the files in 'watch' (inotify wakes up earlier on linux). Default is 1"
+    sd["watch_debounce"] = "param: 'watch' waits until the files did not change for 'watch_debounce' seconds. Default is 0.2"
+    sd["backend"] = "param: sympy or dual. How the errors are propagated: sympy differentiates symbolically, dual evaluates with dual numbers (forward mode) and does not need sympy. Default is sympy if it is installed"
     sd["help"]= "flag/param: shows the entire help if flag, otherwise just help for the 'help'"
     
     # data
@@ -13,20 +13,32 @@ from ..helper import *
     
 
 def triangular_convolution(values, N):
-    res = []
-    weight = [min(i+1, 2*N+1-i) for i in range(2*N+1)] #triangular shape [1,2,3,2,1]
-    weight = weight[N:]+weight[:N] #shift it [3,2,1,1,2]
-    for v, v_i in zipi(values):
-        lower = max(0, v_i - N)
-        upper = min(len(values) - 1, v_i + N)
-        n = sum(weight[v_i-i] for i in range(lower, upper + 1))
-        s = sum(values[i]*weight[v_i-i] for i in range(lower, upper+1))
-        s /= n
-        res.append(s)
-        
-    return res
+    """
+    Smooths values with the triangular weights [1, 2, ..., N+1, ..., 2, 1]. At the edges only the weights that overlap with values are used for the normalization.
+    """
+    values = np.asarray(values, dtype = float)
+    M = len(values)
+    if N <= 0 or M == 0:
+        return values.copy()
+    
+    weight = N + 1 - np.abs(np.arange(-N, N + 1)) # triangular shape [1,2,3,2,1]
+    s = np.convolve(values, weight, mode = "full")[N:N + M]
+    
+    #------------------- normalization: total weight minus the weight that hangs over the edges -------------------
+    tri = lambda k: k * (k + 1) // 2
+    i = np.arange(M)
+    n = (N + 1)**2 - tri(np.maximum(0, N - i)) - tri(np.maximum(0, N - (M - 1 - i)))
+    return s / n
+
+def accumulate(values):
+    return np.cumsum(values, dtype = float)
+
+def error_transform(M, err):
+    """
+    Propagates the errors err through the linear map M: sqrt(M(err^2)).
+    """
+    return np.sqrt(M(np.square(err)))
 
 matrix = namespace()
-matrix.acc = lambda *args: np.add.accumulate
+matrix.acc = lambda *args: accumulate
 matrix.trig_conv = lambda *args: lambda x: triangular_convolution(x, args[0])
-    
@@ -13,9 +13,15 @@ from .xml_parser import *
 from .translator import *
 from .error_propagation import *
 from .import_pyplot import *
+from .pool import *
+from .watch import *
+from .render_cache import *
 from . import valid_options as vo
 
+import os
+import sys
 import copy
+import time
 import collections
 
 lower_min = np.array([ np.inf,  np.inf])
@@ -27,10 +33,10 @@ def reset_lim():
     upper_max = np.array([-np.inf, -np.inf])
 
 def update_lim(xdata, ydata):
-    lower_min[0] = min(lower_min[0], min(xdata))
-    upper_max[0] = max(upper_max[0], max(xdata))
-    lower_min[1] = min(lower_min[1], min(ydata))
-    upper_max[1] = max(upper_max[1], max(ydata))
+    lower_min[0] = min(lower_min[0], np.min(xdata))
+    upper_max[0] = max(upper_max[0], np.max(xdata))
+    lower_min[1] = min(lower_min[1], np.min(ydata))
+    upper_max[1] = max(upper_max[1], np.max(ydata))
 
 def set_lim(ax, opt):
     border = opt.border
@@ -58,18 +64,48 @@ def set_lim(ax, opt):
     ax.set_xlim(lower[0], upper[0])
     ax.set_ylim(lower[1], upper[1])
 
-def get_select(data, y_i, opt, kw):
+def get_select(y_i, opt, kw):
+    """
+    Returns the slice that opt[kw] selects for the y_i-th data set, everything if kw is not set.
+    """
     if kw in opt.keys():
         if len(opt[kw][y_i]) == 2:
             b, sp = opt[kw][y_i]
-            e = len(data[0])
+            e = None
         else:
             b, e, sp = opt[kw][y_i]
-        
-        for i in range(len(data)):
-            data[i] = data[i][b:e][0::sp]
-        
-    return data
+        return slice(b, e, sp)
+    
+    return slice(None)
+
+def new_figure(p):
+    """
+    Returns (fig, ax) for one plot. In batch mode (p.figure_) the same figure is cleared and used again.
+    """
+    fig = p.get("figure_")
+    if fig == None:
+        return pyplot.subplots()
+    fig.clf()
+    return fig, fig.add_subplot(1, 1, 1)
+
+def calc_series(pns, data, expr, memos, backend):
+    """
+    calc_expr(data, expr, backend = backend) with one expr_memo per data and selection in memos, s.t. expressions (and their subexpressions) that several series share are calculated once.
+    """
+    key = (tuple(map(id, pns.data.values())), repr(data.sel)) # the loaded columns stay alive as long as memos
+    if key not in memos:
+        memos[key] = expr_memo()
+    return calc_expr(data, expr, memos[key], backend)
+
+def save_options(pns, opt_save, osel, p):
+    """
+    Saves the options to the opt node osel, in batch mode (p.batch_) they are collected and written at the end.
+    """
+    batch = p.get("batch_")
+    if batch == None:
+        pns.plot_option_to_xml(opt_save, sel = osel, mod="overwrite")
+    else:
+        batch.append((pns, opt_save, osel))
 
 def plot_handler(pns, p):
     #------------------- show available labels -------------------
@@ -161,35 +197,60 @@ def plot_handler(pns, p):
             #~ print(k, opt[k])
     
     #=================== main plot ===================
-    fig, ax = pyplot.subplots()
-    opt.style = collections.deque(opt.style)
-    
-    additional = {}
-    plot_fct = ax.errorbar
-    
+    #------------------- compute all series first, they are part of the render key -------------------
+    series = []
+    memos = p.get("expr_memo_") # batch mode keeps them over all plots
+    if memos == None:
+        memos = {}
     for y, y_i in zipi(opt.y):
-        data = copy.deepcopy(pns.data)
-        #------------------- apply manipulatros to data -------------------
-        data = get_select(data, y_i, opt, "dsel")
+        #------------------- apply manipulatros to data (views, nothing is copied) -------------------
+        data = column_view(pns.data, get_select(y_i, opt, "dsel"))
         
         #------------------- set data -------------------
-        xdata, xerr = calc_expr(pns.label, data, opt.x[y_i])
-        ydata, yerr = calc_expr(pns.label, data, opt.y[y_i])
-        
-        if xerr != None:
-            additional["xerr"] = xerr
-        if yerr != None:
-            additional["yerr"] = yerr
+        xdata, xerr = calc_series(pns, data, opt.x[y_i], memos, p.get("backend", None))
+        ydata, yerr = calc_series(pns, data, opt.y[y_i], memos, p.get("backend", None))
         
         #------------------- get plot selection -------------------
-        data = get_select(data, y_i, opt, "psel")
+        psel = get_select(y_i, opt, "psel")
+        s = {"x": xdata[psel], "y": ydata[psel], "label": label_chooser("ylabel", opt, pns, y_i)}
+        if xerr is not None:
+            s["xerr"] = xerr[psel]
+        if yerr is not None:
+            s["yerr"] = yerr[psel]
+        series.append(s)
+    
+    #------------------- render cache -------------------
+    use_cache = "norender" not in p.flag
+    if use_cache:
+        key = render_key(series, opt, pns.param, filetype(opt.o))
+        create_folder(path(opt.o))
+        state = render_cached(opt.o, key, p.get("render_dir", render_dir))
+        if state != None:
+            save_options(pns, opt_save, spez.osel, p)
+            print("{green}{} {greenb}{} {green}to {greenb}{}{green} with selection {greenb}{}{green} (-> {}){none}".format(state, pns.file_, opt.o, spez.isel, spez.osel, **color))
+            return
+    
+    fig, ax = new_figure(p)
+    opt.style = collections.deque(opt.style)
+    
+    plot_fct = ax.errorbar
+    
+    for s, y_i in zipi(series):
+        additional = {}
+        xdata = s["x"]
+        ydata = s["y"]
+        
+        if "xerr" in s:
+            additional["xerr"] = s["xerr"]
+        if "yerr" in s:
+            additional["yerr"] = s["yerr"]
         
         #------------------- style -------------------
         additional["markersize"] = opt.markersize[y_i]
         additional["fmt"] = opt.style[0]
         opt.style.rotate(-1)
         
-        plot_fct(xdata, ydata, label = label_chooser("ylabel", opt, pns, y_i), **additional)
+        plot_fct(xdata, ydata, label = s["label"], **additional)
         update_lim(xdata, ydata)
         #------------------- linreg -------------------
         linreg = opt.linreg[y_i]
@@ -251,8 +312,12 @@ def plot_handler(pns, p):
     
     create_folder(path(opt.o))
     fig.savefig(opt.o)
+    if p.get("figure_") == None:
+        pyplot.close(fig) # long running processes (watch) would collect all figures
+    if use_cache:
+        store_render(opt.o, key, p.get("render_dir", render_dir), p.get("render_size", render_size))
     
-    pns.plot_option_to_xml(opt_save, sel = spez.osel, mod="overwrite")
+    save_options(pns, opt_save, spez.osel, p)
     print("{green}plotted {greenb}{} {green}to {greenb}{}{green} with selection {greenb}{}{green} (-> {}){none}".format(pns.file_, opt.o, spez.isel, spez.osel, **color))
     reset_lim()
 
@@ -271,11 +336,12 @@ def join_pns(all_pns, p):
                 p.isel = p.get("isel", 1)
                 
                 pns.label = ["_{:0>2}_{}".format(ns_i, l) for l in pns.label]
-                pns.data = list(pns.data)
+                pns.data = collections.OrderedDict(zip(pns.label, pns.data.values()))
                 s = set(pns.param.items())
             else:
-                pns.data += list(ns.data)
-                pns.label += ["_{:0>2}_{}".format(ns_i, l) for l in ns.label]
+                label = ["_{:0>2}_{}".format(ns_i, l) for l in ns.label]
+                pns.data.update(zip(label, ns.data.values()))
+                pns.label += label
                 s = s.intersection(set(ns.param.items()))
         
         # different parameters
@@ -285,6 +351,67 @@ def join_pns(all_pns, p):
         
         return pns
     
+def plot_file(file_, p):
+    """
+    Loads and plots a single file, used by the workers of 'jobs'.
+    """
+    if p.usetex:
+        usetex() # in case the worker did not inherit the rc settings
+    if batch_isel(p):
+        batch_plot([file_], copy.copy(p)) # batch_plot changes p.isel
+    else:
+        plot_handler(file_to_plot(file_, p), p)
+
+def plot_file_worker(task):
+    return captured(plot_file, *task)
+
+def plot_parallel_jobs(files, p):
+    """
+    Plots each file on its own with a pool of p.jobs processes. The output is printed in the order of the files and errors are reported per file.
+    """
+    failed = []
+    for file_, (out, res, err) in zip(files, pool_map(plot_file_worker, [(f, p) for f in files], min(p.jobs, len(files)))):
+        sys.stdout.write(out)
+        if err != None:
+            RED("failed to plot {redb}{}{red}: {}".format(file_, err, **color))
+            failed.append(file_)
+    
+    if len(failed) != 0:
+        ERROR("{} of {} files failed: {}".format(len(failed), len(files), " ".join(failed)))
+
+def convert_worker(task):
+    return captured(txt_to_xml, *task)
+
+def convert_all(files, p):
+    """
+    Converts all txt files to xml in p.conv with a pool of p.jobs processes (for a single file the chunks are parsed in parallel). Files with an xml that is newer than the txt are skipped.
+    """
+    start = time.time()
+    todo = []
+    for file_ in files:
+        dest = xml_dest(file_, p.conv)
+        if readable(dest) and os.path.getmtime(dest) > os.path.getmtime(file_):
+            continue
+        todo.append(file_)
+    
+    failed = []
+    size = 0
+    jobs = min(p.get("jobs", 1), len(todo)) # a single file is parsed in parallel by its txt_reader instead
+    for file_, (out, res, err) in zip(todo, pool_map(convert_worker, ((f, p.conv, p) for f in todo), jobs)):
+        sys.stdout.write(out)
+        if err != None:
+            RED("failed to convert {redb}{}{red}: {}".format(file_, err, **color))
+            failed.append(file_)
+        else:
+            size += os.path.getsize(file_)
+    
+    dt = max(time.time() - start, 1e-9)
+    n = len(todo) - len(failed)
+    YELLOW("converted {yellowb}{}{yellow} files ({} up to date) in {:.2f}s: {yellowb}{:.1f}{yellow} files/s, {yellowb}{:.2f}{yellow} MB/s".format(n, len(files) - len(todo), dt, n / dt, size / dt / 1e6, **color))
+    
+    if len(failed) != 0:
+        ERROR("{} of {} files failed: {}".format(len(failed), len(todo), " ".join(failed)))
+
 def plot(p = parameter):
     p.flag = p.get("flag", []) #since a namespace may lack flag
     files = p.arg
@@ -294,17 +421,12 @@ def plot(p = parameter):
         usetex()
     
     if "conv" in p.keys():
-        for file_ in files:
-            txt_to_xml(file_, p.conv, p)
+        convert_all(files, p)
         return
     
     if "update" in p.flag:
         for file_ in files:
-            pns = xml_to_plot(file_)
-            dir_ = path(file_)
-            if pns.source != None:
-                p.comment = p.get("comment", pns.source["comment"])
-                txt_to_xml(pns.source["file_"], pns.file_, p)
+            update_xml(file_, p)
         return
     
     if "cp_opt" in p.keys() or "cp_opt" in p.flag:
@@ -313,18 +435,43 @@ def plot(p = parameter):
         else:
             isel, osel =  0, 0
         
-        opt = xml_to_plot(files[0]).plot_option
+        opt = xml_to_plot_option(files[0]).plot_option
         for file_ in files[1:]:
-            xml_to_plot(file_).plot_option_to_xml(opt[isel], sel = osel, mod="overwrite")
+            xml_to_plot_option(file_).plot_option_to_xml(opt[isel], sel = osel, mod="overwrite")
             YELLOW("copied opt {yellowb}{} {yellow}from {yellowb}{} {yellow}to {yellowb}{} {yellow}opt {yellowb}{}".format(isel, files[0], file_, osel, **color))
         return
     
     
+    if "watch" in p.flag and batch_isel(p):
+        ERROR("watch plots a single opt node, not isel {}".format(p.isel))
+    
+    #------------------- parallel plots in a process pool (watch plots the changed files itself) -------------------
+    if "parallel" in p.flag and p.get("jobs", 1) > 1 and "watch" not in p.flag:
+        p.isel = p.get("isel", 0)
+        plot_parallel_jobs(files, p)
+        return
+    
+    #------------------- several opt nodes in one pass -------------------
+    if batch_isel(p):
+        batch_plot(files, p)
+        return
+    
+    #------------------- keep plotting on changes -------------------
+    if "watch" in p.flag:
+        watch_plot(files, p)
+        return
+    
+    all_pns = load_all(files, p, lambda f: file_to_plot(f, p))
+    render_all(all_pns, p)
+
+def load_all(files, p, load):
+    """
+    Returns the namespaces of all files that go into the plot (the assoz files of the first one if not parallel), load reads a single file. Sets p.isel.
+    """
     #------------------- read first file -------------------
     all_pns = []
     file_ = files[0]
-    tree = file_to_tree(file_, p)
-    pns0 = tree_to_plot(tree, file_)
+    pns0 = load(file_)
     all_pns.append(pns0)
     
     #------------------- read assoz file -------------------
@@ -332,9 +479,7 @@ def plot(p = parameter):
         if "parallel" in p.flag:
             p.isel = p.get("isel", 0)
             for file_ in files[1:]:
-                file_ = file_
-                tree = file_to_tree(file_, p)
-                all_pns.append(tree_to_plot(tree, file_))
+                all_pns.append(load(file_))
         else:
             p.isel = p.get("isel", 1)
             if p.isel < len(pns0.plot_option) and "assoz_file" in pns0.plot_option[p.isel].keys():
@@ -343,12 +488,14 @@ def plot(p = parameter):
                 p.assoz_file = [relpath(f, path(files[0])) for f in files[1:]]
             
             for file_ in p.assoz_file:
-                file_ = path(files[0]) + "/" + file_
-                tree = file_to_tree(file_, p)
-                all_pns.append(tree_to_plot(tree, file_))
+                file_ = os.path.join(path(files[0]), file_)
+                all_pns.append(load(file_))
     else:
         p.isel = p.get("isel", 0)
     
+    return all_pns
+
+def render_all(all_pns, p):
     #------------------- execute plot -------------------
     if "parallel" in p.flag:
         for pns in all_pns:
@@ -356,7 +503,7 @@ def plot(p = parameter):
     else:
         pns = join_pns(all_pns, p)
         plot_handler(pns, p)
-        
+
 def plot2(args = parameter):
     if "parallel" in p.flag:
         if "split" in p.keys() and "a3data" in p.keys():
@@ -408,4 +555,76 @@ def plot2(args = parameter):
                     txt_to_xml("temp.txt", file_)
                 
                 bash("rm temp.txt", silent = True)
-    
+
+def batch_isel(p):
+    """
+    True if p.isel selects several opt nodes ("all" or a list), see batch_plot.
+    """
+    return p.get("isel") == "all" or is_list(p.get("isel"))
+
+def batch_plot(files, p):
+    """
+    Plots the opt nodes p.isel ("all" or a list) in one pass, each one is saved to its own position (osel = isel). The files are loaded once, expressions that the opt nodes share are calculated once, every plot is drawn on the same (cleared) figure and the options are written once at the end.
+    """
+    loaded = {}
+    def load(file_):
+        if file_ not in loaded:
+            loaded[file_] = file_to_plot(file_, p)
+        return copy.copy(loaded[file_]) # join_pns relabels the namespace
+    
+    sel = p.isel
+    if sel == "all":
+        sel = list(range(max(len(load(files[0]).plot_option), 1)))
+    
+    p.batch_ = []
+    p.expr_memo_ = {}
+    p.figure_ = pyplot.figure()
+    try:
+        for isel in sel:
+            p.isel = isel
+            p.osel = isel
+            render_all(load_all(files, p, load), p)
+        
+        #------------------- one write per file -------------------
+        changes = collections.OrderedDict()
+        for pns, opt_save, osel in p.batch_:
+            changes.setdefault(pns.file_, (pns, []))[1].append((opt_save, osel, "overwrite"))
+        for pns, c in changes.values():
+            pns.plot_options_to_xml(c)
+    finally:
+        pyplot.close(p.figure_)
+        del p.batch_, p.expr_memo_, p.figure_
+
+def watch_plot(files, p):
+    """
+    Plots the files and plots them again each time one of their inputs (the file or the source txt of an xml) changes, until it is interrupted. The data stays in memory and only appended rows are parsed. With 'parallel' only the figures of the changed files are saved again.
+    """
+    live = collections.OrderedDict()
+    def load(file_):
+        if file_ not in live:
+            live[file_] = live_plot(file_, p)
+        return copy.copy(live[file_].load()) # join_pns relabels the namespace
+    
+    watcher = file_watcher(p.get("watch_interval", 1.), p.get("watch_debounce", .2))
+    try:
+        while True:
+            all_pns = load_all(files, p, load)
+            fresh = [lp.fresh for lp in live.values()]
+            if "parallel" in p.flag:
+                render_all([pns for pns, f in zip(all_pns, fresh) if f], p)
+            elif any(fresh):
+                render_all(all_pns, p)
+            
+            stamps = {}
+            for lp in live.values():
+                if lp.fresh:
+                    lp.restamp() # the options we wrote to the xml are no change
+                stamps.update(lp.stamps) # what was read, not what is there now
+            watcher.watch(stamps)
+            CYAN("watching {} files".format(len(stamps)))
+            changed = watcher.wait()
+            CYAN("changed: {}".format(" ".join(changed)))
+    except KeyboardInterrupt:
+        CYAN("stopped watching")
+    finally:
+        watcher.close()
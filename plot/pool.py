@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Author:  Mario S. Könz <mskoenz@gmx.net>
+# Date:    18.10.2026 13:41:52 CEST
+# File:    pool.py
+
+from ..helper import *
+
+import io
+import multiprocessing
+import contextlib
+import collections
+import concurrent.futures
+
+def pool_map(fct, items, jobs = 1):
+    """
+    Maps fct over items with a pool of jobs processes and yields the results in the order of items. fct has to be picklable (module level). At most 2 * jobs items are in flight, s.t. memory stays bounded for long (lazy) item lists. With jobs <= 1 or inside a worker (no nested pools) everything runs in this process.
+    """
+    if jobs <= 1 or in_worker():
+        for it in items:
+            yield fct(it)
+        return
+
+    with concurrent.futures.ProcessPoolExecutor(jobs) as ex:
+        pending = collections.deque()
+        for it in items:
+            pending.append(ex.submit(fct, it))
+            if len(pending) >= 2 * jobs:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+def in_worker():
+    """
+    True in a process started by pool_map.
+    """
+    return multiprocessing.parent_process() != None
+
+def captured(fct, *args):
+    """
+    Calls fct(*args) and captures what it prints. Returns (output, result, error), where error is None or the message of the raised exception.
+    """
+    out = io.StringIO()
+    res, err = None, None
+    try:
+        with contextlib.redirect_stdout(out):
+            res = fct(*args)
+    except Exception as e:
+        err = str(e) if type(e) == Exception else "{}: {}".format(type(e).__name__, e) # ERROR raises plain Exceptions
+    return out.getvalue(), res, err
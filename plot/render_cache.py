@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Author:  Mario S. Könz <mskoenz@gmx.net>
+# Date:    18.10.2026 18:12:37 CEST
+# File:    render_cache.py
+
+from ..helper import *
+
+from .disk_cache import *
+
+import os
+import shutil
+import pickle
+import hashlib
+import matplotlib
+import numpy as np
+
+render_dir = cache_path("render")
+render_size = 1000 # MB, the least recently used figures are evicted above
+render_version = 1
+
+#------------------- key -------------------
+def render_key(series, opt, param, ext):
+    """
+    Content hash of a figure: the computed series (numpy arrays), the fully resolved options, the parameter, the rc settings and the output format.
+    """
+    h = hashlib.blake2b(digest_size = 20)
+    def add(obj):
+        h.update(repr(obj).encode("utf-8"))
+
+    add((render_version, matplotlib.__version__, ext))
+    for s in series:
+        for k in sorted(s.keys()):
+            v = s[k]
+            if isinstance(v, np.ndarray):
+                add((k, v.dtype.str, v.shape))
+                h.update(np.ascontiguousarray(v).tobytes() if v.dtype != object else repr(v.tolist()).encode("utf-8"))
+            else:
+                add((k, v))
+    add(sorted((k, v) for k, v in opt.items() if k != "o")) # the same figure in another place is the same figure
+    add(sorted(param.items()))
+    add(sorted((k, repr(v)) for k, v in matplotlib.rcParams.items()))
+    return h.hexdigest()
+
+#------------------- lookup / store -------------------
+def index_file(dir_, out):
+    return os.path.join(dir_, "out", hashlib.sha1(os.path.abspath(out).encode("utf-8")).hexdigest())
+
+def blob_file(dir_, key, ext):
+    return os.path.join(dir_, "fig", "{}.{}".format(key, ext))
+
+def render_cached(out, key, dir_ = render_dir):
+    """
+    Brings the figure out up to date from the cache. Returns "unchanged" if out was written with key and not touched since, "copied" if the figure was copied from the cache and None if it has to be rendered.
+    """
+    try:
+        with open(index_file(dir_, out), "rb") as ifs:
+            idx = pickle.load(ifs)
+        st = os.stat(out)
+        if idx == (key, st.st_size, st.st_mtime_ns):
+            return "unchanged"
+    except Exception: # no index, no output or broken index
+        pass
+
+    blob = blob_file(dir_, key, filetype(out))
+    if not os.path.isfile(blob):
+        return None
+    try:
+        os.utime(blob) # marks the figure as recently used
+        shutil.copyfile(blob, out)
+    except OSError:
+        return None
+    write_index(dir_, out, key)
+    return "copied"
+
+def write_index(dir_, out, key):
+    st = os.stat(out)
+    file_ = index_file(dir_, out)
+    os.makedirs(path(file_), exist_ok = True)
+    with atomic_file(file_) as ofs:
+        pickle.dump((key, st.st_size, st.st_mtime_ns), ofs, protocol = pickle.HIGHEST_PROTOCOL)
+
+def store_render(out, key, dir_ = render_dir, max_mb = render_size):
+    """
+    Stores the just rendered figure out in the cache under key and evicts down to max_mb.
+    """
+    blob = blob_file(dir_, key, filetype(out))
+    try:
+        os.makedirs(path(blob), exist_ok = True)
+        with atomic_file(blob) as ofs, open(out, "rb") as ifs:
+            shutil.copyfileobj(ifs, ofs, 1 << 20)
+        write_index(dir_, out, key)
+    except OSError as e:
+        WARNING("could not write render cache for {}: {}".format(out, e))
+        return
+    evict_renders(path(blob), max_mb * 1e6)
+
+def evict_renders(dir_, max_bytes):
+    """
+    Removes the least recently used figures in dir_ until the total size is below max_bytes.
+    """
+    def usage(blob):
+        st = os.stat(blob)
+        return st.st_mtime, st.st_size
+    
+    def remove(blob):
+        try:
+            os.remove(blob)
+        except OSError: # removed by someone else right now
+            pass
+    
+    evict_lru(dir_, max_bytes, usage, remove)
@@ -8,8 +8,19 @@
 from ..helper import *
 from ..parameter import *
 from ..xml_helper import *
+from .column import *
+from .pool import *
+from .disk_cache import *
 
+import os
+import re
+import io
+import shutil
+import hashlib
+import contextlib
+import collections
 import xml.etree.ElementTree as xml
+import xml.sax.saxutils as saxutils
 import numpy as np
 
 def find_nodes(tree):
@@ -25,9 +36,115 @@ def get_old_tree(dest):
     Eopt, Eparam, Elabel, Edata = find_nodes(tree)
     Eparam.clear()
     Elabel.clear()
+    encoding = Edata.attrib.get("encoding", "text")
     Edata.clear()
+    Edata.attrib["encoding"] = encoding # an update keeps the encoding
     return tree
 
+def read_plot_option(file_):
+    """
+    Returns the plot_option node of the xml file_ without parsing the rest of the file (it is the first node in plot).
+    """
+    depth = 0
+    for event, elem in xml.iterparse(file_, events = ("start", "end")):
+        if event == "start":
+            depth += 1
+            if depth == 2 and elem.tag != "plot_option":
+                return None
+        else:
+            depth -= 1
+            if depth == 1 and elem.tag == "plot_option":
+                return elem
+    return None
+
+def read_data_encoding(file_):
+    """
+    Returns the encoding of the data node of the xml file_, the parse stops at the start tag of the data node.
+    """
+    depth = 0
+    for event, elem in xml.iterparse(file_, events = ("start", "end")):
+        if event == "start":
+            depth += 1
+            if depth == 2 and elem.tag == "data":
+                return elem.attrib.get("encoding", "text")
+        else:
+            depth -= 1
+    return "text"
+
+def find_plot_option(ifs, chunk = 1 << 16):
+    """
+    Returns the head of the file (bytes) and the byte range [start, end) of the plot_option node in it, including the whitespace after it. Returns None if plot_option is not the first node in plot.
+    """
+    head = b""
+    start, end = -1, -1
+    while True:
+        block = ifs.read(chunk)
+        head += block
+        if start == -1:
+            start = head.find(b"<plot_option")
+            if start != -1 and not re.fullmatch(b"(?s)\\s*(<\\?xml[^>]*\\?>)?\\s*<plot(\\s[^>]*)?>\\s*", head[:start]):
+                return None
+        if start != -1:
+            close = head.find(b">", start)
+            if close != -1 and head[close - 1:close] == b"/":
+                end = close + 1
+            else:
+                end = head.find(b"</plot_option>", start)
+                end = -1 if end == -1 else end + len(b"</plot_option>")
+            if end != -1:
+                ws = re.match(b"\\s*", head[end:]).end()
+                if end + ws < len(head) or block == b"":
+                    return head, start, end, end + ws
+        if block == b"":
+            return None
+
+def write_plot_option(file_, opts):
+    """
+    Replaces the plot_option node of the xml file_ by opts without touching the rest of the file. If the new node fits into the old one (the space after it is padding) it is overwritten in place, otherwise the rest of the file is streamed into a new file. Returns False if nothing had to be written.
+    """
+    opts.tail = None
+    prettify(opts, level = 1)
+    opts.tail = None
+    new = xml.tostring(opts, encoding = "unicode").encode("utf-8")
+    
+    with open(file_, "rb") as ifs:
+        found = find_plot_option(ifs)
+    
+    if found == None: #------------------- unusual layout, rewrite the whole tree -------------------
+        tree = xml.parse(file_)
+        root = tree.getroot()
+        old = root.find("plot_option")
+        if old != None:
+            root.remove(old)
+        root.insert(0, opts)
+        prettify(root)
+        tree.write(file_, encoding="utf-8", xml_declaration = True)
+        return True
+    
+    head, start, end, ws_end = found
+    old = head[start:end]
+    if new == old:
+        return False
+    
+    ws = head[end:ws_end]
+    indent = ws[ws.rfind(b"\n"):] if b"\n" in ws else ws # keep the line break and indentation of the next node
+    
+    if len(new) + len(indent) <= ws_end - start: #------------------- in place -------------------
+        block = new + b" " * (ws_end - start - len(new) - len(indent)) + indent
+        with open(file_, "r+b") as ofs:
+            ofs.seek(start)
+            ofs.write(block)
+        return True
+    
+    #------------------- stream the rest of the file into a new one -------------------
+    block = new + b" " * (len(new) // 2 + 64) + indent # reserve some space for the next change
+    with atomic_file(file_) as ofs, open(file_, "rb") as ifs:
+        ofs.write(head[:start])
+        ofs.write(block)
+        ifs.seek(ws_end)
+        shutil.copyfileobj(ifs, ofs, 1 << 20)
+    return True
+
 def get_new_tree():
     root   = xml.Element("plot")
     Eopt   = xml.Element("plot_option")
@@ -41,7 +158,7 @@ def get_new_tree():
     root.append(Edata)
     return tree
 
-def fill_data(tree, param, label, data, file_, comment):
+def fill_data(tree, param, label, data, file_, comment, encoding = None):
     # idx addition
     if label[0] != "index":
         label.insert(0, "index")
@@ -49,38 +166,192 @@ def fill_data(tree, param, label, data, file_, comment):
             line.insert(0, line_i)
     
     Eopt, Eparam, Elabel, Edata = find_nodes(tree)
-    Eparam.attrib = param
+    Eparam.attrib = to_str(param) # attributes have to be strings
     Elabel.text = " ".join(label)
-    for line in data:
-        d = xml.Element("d")
-        d.text = " ".join([str(i) for i in line])
-        Edata.append(d)
+    
+    encoding = encoding or Edata.attrib.get("encoding", "text")
+    if encoding not in valid_encodings:
+        ERROR("encoding {} not in {}".format(encoding, valid_encodings))
+    
+    if encoding == "text":
+        Edata.attrib.pop("encoding", None)
+        for line in data:
+            d = xml.Element("d")
+            d.text = " ".join([str(i) for i in line])
+            Edata.append(d)
+    else:
+        Edata.attrib["encoding"] = encoding
+        append_block(Edata, rows_to_columns(label, data))
     Eopt.attrib["file_"] = file_
     Eopt.attrib["comment"] = to_str(comment)
     
-def txt_to_intermed(file_, p):
-    comment = make_list(p.get("comment", ["#"]))
+#------------------- streaming txt reader -------------------
+def data_lines(ifs, comment):
+    """
+    Yields the lines of ifs that are not comments (first character in comment) and not empty.
+    """
+    for l in ifs:
+        if l[0] in comment or l.isspace():
+            continue
+        yield l
+
+def parse_lines(lines, n, file_):
+    """
+    Splits the lines into rows of tokens, every row needs at least n entries.
+    """
+    rows = split_clean_lines(lines)
+    for r in rows:
+        if len(r) < n:
+            ERROR("{}: the row \"{}\" has {} instead of {} entries".format(file_, " ".join(map(to_str, r)), len(r), n))
+    return rows
+
+def parse_range(task):
+    """
+    Parses the bytes [start, end) of the txt file_ (starting and ending at a line boundary) into rows or, if columns, into an OrderedDict label -> column. Used by the workers of txt_reader.
+    """
+    file_, start, end, comment, label, columns = task
+    with open(file_, "rb") as ifs:
+        ifs.seek(start)
+        raw = ifs.read(end - start)
+    rows = parse_lines(list(data_lines(io.StringIO(raw.decode("utf-8"), newline = None), comment)), len(label), file_)
+    if columns:
+        return tokens_to_columns(label, rows)
+    return to_number(rows)
+
+def last_newline(ifs, start, end, chunk = 1 << 16):
+    """
+    Returns the position after the last line break in [start, end) of ifs (binary), or start if there is none.
+    """
+    while end > start:
+        pos = max(end - chunk, start)
+        ifs.seek(pos)
+        i = ifs.read(end - pos).rfind(b"\n")
+        if i != -1:
+            return pos + i + 1
+        end = pos
+    return start
+
+def txt_check(file_, offset, n = 1 << 12):
+    """
+    Hash of the first and the last n bytes before offset in file_, to notice if the part of a txt that was already converted got rewritten.
+    """
+    h = hashlib.blake2b(digest_size = 10)
+    with open(file_, "rb") as ifs:
+        h.update(ifs.read(min(n, offset)))
+        ifs.seek(max(offset - n, 0))
+        h.update(ifs.read(offset - max(offset - n, 0)))
+    return h.hexdigest()
+
+class txt_reader():
+    """
+    Reads the txt file_ in chunks of about chunk_bytes, split at line boundaries. The header (#param line and label) is read here, rows() and columns() stream the data, s.t. the memory is bounded by the chunk size and not by the file size. Comment lines are skipped like before (first character in comment), empty lines are skipped as well. With jobs > 1 the chunks are parsed in a process pool.
     
-    if not readable(file_):
-        ERROR("could not read {}".format(src))
-    
-    ifs = open(file_, "r")
-    #------------------- data -------------------
-    label = []
-    data =  []
-    param = {}
-    #------------------- read txt file -------------------
-    all_lines = ifs.readlines()
-    if len(all_lines[1]) > 6 and all_lines[1][:6] == "#param": #read param line if there
-        for param_item in split_clean(all_lines[1][6:]):
-            key, val = to_number(param_item.split("="))
-            param[key] = val
-    
-    lines = [to_number(split_clean(l)) for l in all_lines if l[0] not in comment]
-    label = lines[0]
-    data = lines[1:]
-    
-    return param, label, data, file_, comment
+    The data is read up to end, the size of file_ when the reader was created (size) or the last line break before, if complete. With offset and rows the reader starts at the byte offset with the index rows, to read what was appended since an earlier reader stopped at its end.
+    """
+    def __init__(self, file_, p, chunk_bytes = 1 << 21, offset = None, rows = 0, complete = False):
+        self.file_ = file_
+        self.comment = make_list(p.get("comment", ["#"]))
+        self.chunk_bytes = chunk_bytes
+        self.jobs = p.get("jobs", 1)
+        self.param = {}
+        self.label = []
+        
+        if not readable(file_):
+            ERROR("could not read {}".format(file_))
+        
+        #------------------- header -------------------
+        with open(file_, "rb") as ifs:
+            line_i = 0
+            while line_i < 2 or not self.label: # the #param line is always the second line
+                l = ifs.readline()
+                if not l:
+                    break
+                l = l.decode("utf-8")
+                if line_i == 1 and len(l) > 6 and l[:6] == "#param": #read param line if there
+                    for param_item in split_clean(l[6:]):
+                        key, val = to_number(param_item.split("="))
+                        self.param[key] = val
+                if not self.label and l[0] not in self.comment and not l.isspace():
+                    self.label = [to_str(x) for x in to_number(split_clean(l))]
+                    self.offset = ifs.tell() # the data starts after the label
+                line_i += 1
+            
+            if not self.label:
+                ERROR("no label line found in {}".format(file_))
+            if offset != None:
+                if offset < self.offset:
+                    ERROR("offset {} is inside the header of {}".format(offset, file_))
+                self.offset = offset
+            
+            ifs.seek(0, os.SEEK_END)
+            self.size = self.end = ifs.tell()
+            if complete: # a line that is written right now is left for the next reader
+                self.end = last_newline(ifs, self.offset, self.end)
+        
+        self.data_label = list(self.label)
+        self.index = self.label[0] != "index"
+        if self.index:
+            self.label.insert(0, "index")
+        self.row0 = rows
+        self.rows_read = 0
+    
+    def ranges(self):
+        """
+        Yields the byte ranges (start, end) of about chunk_bytes that split the data between offset and end at line boundaries.
+        """
+        start = self.offset
+        with open(self.file_, "rb") as ifs:
+            while start < self.end:
+                ifs.seek(start + self.chunk_bytes)
+                ifs.readline()
+                end = min(ifs.tell(), self.end)
+                yield start, end
+                start = end
+    
+    def chunks(self, columns):
+        """
+        Yields the parsed chunks (without index) in the order of the file, in a process pool if jobs > 1.
+        """
+        tasks = ((self.file_, start, end, self.comment, self.data_label, columns) for start, end in self.ranges())
+        for res in pool_map(parse_range, tasks, self.jobs):
+            yield res
+    
+    def rows(self):
+        """
+        Yields the data as chunks of rows (lists of to_number results), with the index inserted if the file has none.
+        """
+        for rows in self.chunks(False):
+            if self.index:
+                row_i = self.row0 + self.rows_read
+                for r in rows:
+                    r.insert(0, row_i)
+                    row_i += 1
+            self.rows_read += len(rows)
+            if rows:
+                yield rows
+    
+    def columns(self):
+        """
+        Yields the data as chunks of typed columns (OrderedDict label -> column), with the index inserted if the file has none.
+        """
+        for cols in self.chunks(True):
+            n = columns_len(cols)
+            if n == 0:
+                continue
+            if self.index:
+                row_i = self.row0 + self.rows_read
+                res = collections.OrderedDict([("index", np.arange(row_i, row_i + n, dtype = np.int64))])
+                res.update(cols)
+                cols = res
+            self.rows_read += n
+            yield cols
+
+def txt_to_intermed(file_, p):
+    reader = txt_reader(file_, p)
+    data = []
+    for rows in reader.rows():
+        data.extend(rows)
+    return reader.param, reader.label, data, file_, reader.comment
 
 def txt_to_tree(file_, p):
     tree = get_new_tree()
@@ -88,25 +359,220 @@ def txt_to_tree(file_, p):
     fill_data(tree, *l)
     return tree
 
-def txt_to_xml(file_, dest, p): #output
-    #------------------- generate/read xml -------------------
+def txt_to_columns(file_, p, complete = False):
+    """
+    Returns the txt_reader of file_ and its data as OrderedDict label -> column, without building a tree. With complete only the complete lines are read (see txt_reader).
+    """
+    reader = txt_reader(file_, p, complete = complete)
+    return reader, concat_columns(reader.columns(), reader.label)
+
+#------------------- streaming xml writer -------------------
+def to_cell(obj):
+    """
+    Text of obj in a <d> row, strings with whitespace are quoted s.t. split_clean and to_number give them back.
+    """
+    if is_str(obj):
+        if obj and obj.split() == [obj]:
+            return obj
+        return "'{}'".format(obj) if '"' in obj else '"{}"'.format(obj)
+    if is_list(obj):
+        return to_str(obj)
+    return str(obj)
+
+class xml_writer():
+    """
+    Writes the plot xml file_ in the layout of prettify, but the data node is written chunk by chunk with append, s.t. the data is never in memory as a whole. Everything goes to a temporary file that replaces file_ on close. Some space is left after the plot_option node, s.t. write_plot_option can change it in place.
+    
+    With append = pos (see data_end) the chunks are appended to the data node of the existing file_ instead, opts and param are not used then.
+    """
+    def __init__(self, file_, opts, param, label, encoding = "text", append = None):
+        if encoding not in valid_encodings:
+            ERROR("encoding {} not in {}".format(encoding, valid_encodings))
+        self.file_ = file_
+        self.label = label
+        self.encoding = encoding
+        self.pos = append
+        
+        self.stack = contextlib.ExitStack()
+        if append != None:
+            self.ofs = self.stack.enter_context(open(file_, "r+b"))
+            self.ofs.seek(append)
+            return
+        
+        self.ofs = self.stack.enter_context(atomic_file(file_))
+        
+        Elabel = xml.Element("label")
+        Elabel.text = " ".join(label)
+        Edata = xml.Element("data", {} if encoding == "text" else {"encoding": encoding})
+        
+        self.write("<?xml version='1.0' encoding='utf-8'?>\n<plot>")
+        n = self.write_node(opts, 1)
+        self.write(" " * (n // 2 + 64)) # reserve some space for write_plot_option
+        self.write_node(xml.Element("parameter", to_str(param)), 1)
+        self.write_node(Elabel, 1)
+        self.write("\n    " + xml.tostring(Edata, encoding = "unicode")[:-3] + ">") # <data ... />
+    
+    def write(self, text):
+        self.ofs.write(text.encode("utf-8"))
+    
+    def write_node(self, node, level):
+        prettify(node, level = level)
+        node.tail = None
+        text = xml.tostring(node, encoding = "unicode")
+        self.write("\n" + "    " * level + text)
+        return len(text)
+    
+    def append(self, rows = None, columns = None):
+        """
+        Appends a chunk of rows (text encoding) or columns (binary encodings) to the data node, the other one is generated if not given.
+        """
+        if self.encoding == "text":
+            if rows == None:
+                rows = zip(*[c.tolist() for c in columns.values()])
+            text = "\n".join([" ".join(map(to_cell, r)) for r in rows])
+            if not text:
+                return
+            if "&" in text or "<" in text or ">" in text:
+                text = saxutils.escape(text)
+            self.write("\n        <d>" + text.replace("\n", "</d>\n        <d>") + "</d>")
+        else:
+            if columns == None:
+                columns = rows_to_columns(self.label, rows)
+            if columns_len(columns) == 0:
+                return
+            Edata = xml.Element("data", {"encoding": self.encoding})
+            append_block(Edata, columns)
+            self.write_node(Edata[0], 2)
+    
+    def close(self):
+        self.write("\n    </data>\n</plot>\n")
+        if self.pos != None:
+            self.ofs.truncate()
+        self.stack.close() # replaces file_ with the new one
+    
+    def abort(self):
+        if self.pos != None: # cut off what was appended
+            self.ofs.seek(self.pos)
+            self.close()
+            return
+        e = Exception("aborted")
+        self.stack.__exit__(type(e), e, None) # removes the new file
+
+def data_end(file_, tail = b"\n    </data>\n</plot>\n"):
+    """
+    Returns the position of the closing data tag in the xml file_ (as written by xml_writer or prettify), where new rows can be appended. Returns None for another layout.
+    """
+    with open(file_, "rb") as ifs:
+        ifs.seek(0, os.SEEK_END)
+        size = ifs.tell()
+        if size < len(tail):
+            return None
+        ifs.seek(size - len(tail))
+        if ifs.read() != tail:
+            return None
+    return size - len(tail)
+
+def xml_dest(file_, dest):
+    """
+    Returns the xml file that file_ is converted to, if dest is a folder it will be created.
+    """
     if filetype(dest) == None: #if folder
         create_folder(dest)
         dest += "/" + filename(file_, suffix = "xml")
+    return dest
+
+def txt_to_xml(file_, dest, p): #output
+    """
+    Converts the txt file_ into the xml dest chunk by chunk. The plot_option and the encoding of an existing dest are kept. The byte offset, the number of rows and a check hash of the converted part of file_ are stored in the plot_option attributes for append_txt.
+    """
+    dest = xml_dest(file_, dest)
     
+    reader = txt_reader(file_, p, complete = True) # the offset has to end on a line break for append_txt
+    if reader.end < reader.size:
+        WARNING("the incomplete last line of {} is left for the next update".format(file_))
+    opts, encoding = None, "text"
     if readable(dest):
-        tree = get_old_tree(dest)
-    else:
-        tree = get_new_tree()
-    
-    l = txt_to_intermed(file_, p)
-    fill_data(tree, *l)
+        opts = read_plot_option(dest)
+        encoding = read_data_encoding(dest)
+    if opts == None:
+        opts = xml.Element("plot_option")
+    opts.attrib["file_"] = file_
+    opts.attrib["comment"] = to_str(reader.comment)
+    opts.attrib["offset"] = str(reader.end)
+    opts.attrib["rows"] = "0"
+    opts.attrib["check"] = txt_check(file_, reader.end)
+    encoding = p.get("encoding", encoding)
     
-    prettify(tree.getroot())
-    tree.write(dest, encoding="utf-8", xml_declaration = True)
+    writer = xml_writer(dest, opts, reader.param, reader.label, encoding)
+    try:
+        for rows in reader.rows():
+            writer.append(rows = rows)
+    except:
+        writer.abort()
+        raise
+    writer.close()
+    opts.attrib["rows"] = str(reader.rows_read)
+    write_plot_option(dest, opts) # fits in place
     
     if "update" in p.flag:
         desc = "updated"
     else:
         desc = "converted"
     print("{yellow}{} {yellowb}{}{yellow} to {yellowb}{}{none}".format(desc, file_, dest, **color))
+
+def txt_tail(file_, p, offset, rows, check):
+    """
+    Returns a txt_reader for the complete lines that were appended to the txt file_ after offset (rows rows with the check hash were read up to there). Returns None if the part before offset changed (truncated, rewritten or the last line was incomplete), then file_ has to be read again.
+    """
+    if not readable(file_):
+        return None
+    with open(file_, "rb") as ifs:
+        ifs.seek(0, os.SEEK_END)
+        if ifs.tell() < offset: # truncated
+            return None
+        ifs.seek(max(offset - 1, 0))
+        if offset > 0 and ifs.read(1) != b"\n": # the last line read was incomplete
+            return None
+    if txt_check(file_, offset) != check: # rewritten
+        return None
+    return txt_reader(file_, p, offset = offset, rows = rows, complete = True)
+
+def append_txt(file_, dest, p, opts, collect = None):
+    """
+    Appends the rows that were added to the txt file_ since it was converted to dest, opts is the plot_option node of dest. Only complete lines are read, a line that is written right now is left for the next call. If collect is a list, the new rows are appended to it as chunks of columns. Returns the number of new rows or None if the converted part of file_ changed (truncated, rewritten, other comment or encoding) and dest has to be converted again.
+    """
+    a = opts.attrib
+    if "offset" not in a:
+        return None
+    if to_str(make_list(p.get("comment", ["#"]))) != a.get("comment"):
+        return None
+    encoding = read_data_encoding(dest)
+    if p.get("encoding", encoding) != encoding:
+        return None
+    pos = data_end(dest)
+    if pos == None:
+        return None
+    
+    rows = int(a["rows"])
+    reader = txt_tail(file_, p, int(a["offset"]), rows, a.get("check"))
+    if reader == None:
+        return None
+    if reader.end == reader.offset: # nothing new
+        return 0
+    
+    writer = xml_writer(dest, None, None, reader.label, encoding, append = pos)
+    try:
+        for r in reader.rows():
+            if collect != None:
+                collect.append(rows_to_columns(reader.label, r))
+            writer.append(rows = r)
+    except:
+        writer.abort()
+        raise
+    writer.close()
+    
+    a["offset"] = str(reader.end)
+    a["rows"] = str(rows + reader.rows_read)
+    a["check"] = txt_check(file_, reader.end)
+    write_plot_option(dest, opts)
+    return reader.rows_read
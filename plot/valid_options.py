@@ -49,4 +49,16 @@ valid_commands = [
     , "conf"
     , "help"
     , "parallel"
+    , "jobs"
+    , "encoding"
+    , "nocache"
+    , "norender"
+    , "cache_dir"
+    , "cache_size"
+    , "watch"
+    , "watch_interval"
+    , "watch_debounce"
+    , "render_dir"
+    , "render_size"
+    , "backend"
 ]
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Author:  Mario S. Könz <mskoenz@gmx.net>
+# Date:    18.10.2026 17:05:41 CEST
+# File:    watch.py
+
+from ..helper import *
+
+from .xml_parser import *
+from .column import *
+
+import os
+import time
+import select
+import ctypes
+import ctypes.util
+
+#------------------- inotify through ctypes (linux only) -------------------
+IN_MODIFY      = 0x002
+IN_ATTRIB      = 0x004
+IN_CLOSE_WRITE = 0x008
+IN_MOVED_TO    = 0x080
+IN_CREATE      = 0x100
+
+def inotify_init():
+    """
+    Returns (libc, fd) of a new non blocking inotify instance or None if there is no inotify.
+    """
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno = True)
+        fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+    except (OSError, AttributeError): # no libc or no inotify_init1 (i.e. macOS)
+        return None
+    if fd < 0:
+        return None
+    return libc, fd
+
+def stamp_or_none(file_):
+    try:
+        st = os.stat(file_)
+    except OSError: # i.e. moved away while it is rewritten
+        return None
+    return st.st_size, st.st_mtime_ns
+
+class file_watcher():
+    """
+    Waits until files change. With inotify the folders of the files are watched, otherwise (or additionally, if an event got lost) the files are polled every interval seconds. Only a different size or mtime counts as change, compared to when watch was called, s.t. events of other files in the folders and our own writes before watch are ignored. A burst of changes is collected until the files were quiet for debounce seconds.
+    """
+    def __init__(self, interval = 1., debounce = .2):
+        self.interval = interval
+        self.debounce = debounce
+        self.inotify = inotify_init()
+        self.dirs = {}
+        self.stamps = {}
+
+    def watch(self, stamps):
+        """
+        Sets the watched files, stamps (file -> stamp_or_none) is the state that wait compares against, i.e. the state that was loaded.
+        """
+        self.stamps = dict(stamps)
+        if self.inotify == None:
+            return
+        libc, fd = self.inotify
+        for d in set(os.path.abspath(path(f) or ".") for f in stamps):
+            if d not in self.dirs:
+                self.dirs[d] = libc.inotify_add_watch(fd, d.encode("utf-8"), IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE)
+
+    def sleep(self, timeout):
+        """
+        Sleeps for timeout seconds or until there is an inotify event.
+        """
+        if self.inotify == None:
+            time.sleep(timeout)
+            return
+        fd = self.inotify[1]
+        if select.select([fd], [], [], timeout)[0]:
+            try:
+                while os.read(fd, 1 << 16): # only the wake up matters, the stamps decide
+                    pass
+            except BlockingIOError:
+                pass
+
+    def changed(self):
+        return [f for f, s in self.stamps.items() if stamp_or_none(f) != s]
+
+    def wait(self):
+        """
+        Blocks until some of the watched files changed and were quiet for debounce seconds, returns the changed files.
+        """
+        while not self.changed():
+            self.sleep(self.interval)
+
+        last = None
+        while True:
+            now = dict((f, stamp_or_none(f)) for f in self.stamps)
+            if now == last:
+                return self.changed()
+            last = now
+            time.sleep(self.debounce)
+
+    def close(self):
+        if self.inotify != None:
+            os.close(self.inotify[1])
+            self.inotify = None
+
+#------------------- data that stays in memory -------------------
+class live_plot():
+    """
+    Keeps the plot namespace of file_ in memory. load reads it again only if file_ (or the source txt of an xml) changed. Rows that were appended to a txt are parsed alone, for an xml they are also appended to the xml (like update).
+    """
+    def __init__(self, file_, p):
+        self.file_ = file_
+        self.p = p
+        self.nsx = None
+        self.stamps = {}
+        self.fresh = False
+
+    def source(self):
+        if filetype(self.file_) != "xml" or self.nsx == None or self.nsx.source == None:
+            return None
+        src = self.nsx.source.get("file_", None)
+        if src == None or not readable(src):
+            return None
+        return src
+
+    def inputs(self):
+        """
+        The files the plot depends on.
+        """
+        src = self.source()
+        return [self.file_] if src == None else [self.file_, src]
+
+    def restamp(self):
+        """
+        Marks our own write of the options to the xml as loaded. The source txt keeps the stamp from before it was read, rows that were appended since are read by the next load.
+        """
+        if filetype(self.file_) == "xml":
+            self.stamps[self.file_] = stamp_or_none(self.file_)
+
+    def load(self):
+        """
+        Returns the up to date plot namespace, fresh tells if something was read. The inputs are stamped before they are read, s.t. a change while reading counts as change.
+        """
+        self.fresh = False
+        now = dict((f, stamp_or_none(f)) for f in self.inputs())
+        changed = [f for f, s in now.items() if s != self.stamps.get(f)]
+        if self.nsx != None and not changed:
+            return self.nsx
+
+        if filetype(self.file_) == "txt":
+            self.load_txt()
+        elif self.nsx != None and changed == [self.source()]:
+            self.load_source()
+            now[self.file_] = stamp_or_none(self.file_) # our own append to the xml
+        else:
+            self.nsx = file_to_plot(self.file_, self.p)
+
+        self.stamps = dict((f, now[f] if f in now else stamp_or_none(f)) for f in self.inputs()) # the source of a new xml is only known now
+        self.fresh = True
+        return self.nsx
+
+    def append(self, chunks):
+        label = self.nsx.label
+        self.nsx.data = concat_columns([self.nsx.data, concat_columns(chunks, label)], label)
+
+    def load_txt(self):
+        if self.nsx != None:
+            reader = txt_tail(self.file_, self.p, *self.tail)
+            if reader != None:
+                self.append(reader.columns())
+                self.tail = (reader.end, reader.row0 + reader.rows_read, txt_check(self.file_, reader.end))
+                return
+
+        reader, data = txt_to_columns(self.file_, self.p, complete = True) # the writer might be in the middle of a line
+        self.nsx = txt_to_plot(self.file_, self.p, reader, data)
+        self.tail = (reader.end, reader.rows_read, txt_check(self.file_, reader.end))
+
+    def load_source(self):
+        opts = read_plot_option(self.file_)
+        chunks = []
+        n = None if opts == None else append_txt(self.source(), self.file_, self.p, opts, chunks)
+        if n == None: # converted again
+            update_xml(self.file_, self.p)
+            self.nsx = file_to_plot(self.file_, self.p)
+            return
+        self.append(chunks)
+        set_plot_option(self.nsx, opts)
+        print("{yellow}appended {yellowb}{}{yellow} rows of {yellowb}{}{yellow} to {yellowb}{}{none}".format(n, self.source(), self.file_, **color))
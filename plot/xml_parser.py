@@ -8,21 +8,32 @@
 from ..helper import *
 
 from .txt_to_xml import *
+from .column import *
+from .column_cache import *
 from ..xml_helper import *
 
+import os
+import re
+import copy
+import shutil
+import collections
 import xml.etree.ElementTree as xml
 import numpy as np
 
 def plot_option_to_xml(nsx, popt, sel = 0, mod = "update"):
-    opts = nsx.root.find("plot_option")
-    
-    popt = dict([(k, to_str(v)) for k, v in popt.items()])
-    
+    plot_options_to_xml(nsx, [(popt, sel, mod)])
+
+def plot_options_to_xml(nsx, changes):
+    """
+    Applies the changes (list of (popt, sel, mod), see plot_option_to_xml) to the opt nodes of the xml file nsx.file_ and writes them in one go.
+    """
+    opts = read_plot_option(nsx.file_) # only the options are parsed and written back
     if opts == None: #------------------- create new element if tag not found -------------------
         opts = xml.Element("plot_option")
-        opts.append(xml.Element("opt", popt))
-        nsx.root.insert(0, opts)
-    else: #------------------- update or overwrite current tag -------------------
+    
+    for popt, sel, mod in changes:
+        popt = dict([(k, to_str(v)) for k, v in popt.items()])
+        #------------------- update or overwrite current tag -------------------
         opt = opts.findall("opt")
         if len(opt) <= sel:
             for i in range(sel - len(opt) + 1):
@@ -35,10 +46,34 @@ def plot_option_to_xml(nsx, popt, sel = 0, mod = "update"):
         elif mod == "overwrite":
             opt[sel].attrib = popt
     
-    #------------------- make xml nicer (it changes and strips text) -------------------
-    prettify(nsx.root)
-    # write back to file
-    nsx.tree.write(nsx.file_, encoding="utf-8", xml_declaration = True)
+    before = stamp(nsx.file_)
+    if write_plot_option(nsx.file_, opts) and nsx.get("cache") != None:
+        restamp(nsx.file_, nsx.cache, before) # only the options changed
+
+def update_xml(file_, p):
+    """
+    Updates the xml file_ from its source txt. Only the rows that were appended to the txt since the last conversion are parsed and appended, if the txt was truncated or rewritten it is converted again.
+    """
+    opts = read_plot_option(file_)
+    if opts == None or "file_" not in opts.attrib:
+        return
+    source = opts.attrib["file_"]
+    p.comment = p.get("comment", to_number(opts.attrib["comment"]))
+    
+    n = append_txt(source, file_, p, opts)
+    if n == None:
+        txt_to_xml(source, file_, p)
+    else:
+        print("{yellow}appended {yellowb}{}{yellow} rows of {yellowb}{}{yellow} to {yellowb}{}{none}".format(n, source, file_, **color))
+
+def xml_to_plot_option(file_):
+    """
+    Namespace with the options (plot_option, source and plot_option_to_xml) of the xml file_, without the data.
+    """
+    nsx = namespace()
+    nsx.file_ = file_
+    set_plot_option(nsx, read_plot_option(file_))
+    return nsx
 
 def tree_to_plot(tree, file_):
     nsx = namespace()
@@ -49,9 +84,16 @@ def tree_to_plot(tree, file_):
     
     nsx.param = nsx.root.find("parameter").attrib # i.o. not to collide with HTML "param"
     nsx.label = split_clean(nsx.root.find("label").text)
-    nsx.data = transpose(to_number(split_clean([c.text for c in nsx.root.find("data").findall("d")])))
+    nsx.data = read_columns(nsx.root.find("data"), nsx.label)
     
-    opts = nsx.root.find("plot_option")
+    set_plot_option(nsx, nsx.root.find("plot_option"))
+    return nsx
+
+def set_plot_option(nsx, opts):
+    """
+    Sets plot_option, source and the function plot_option_to_xml of nsx from the plot_option node opts (can be None).
+    """
+    file_ = nsx.file_
     if opts == None:
         nsx.plot_option = [{}]
         nsx.source = None
@@ -62,9 +104,70 @@ def tree_to_plot(tree, file_):
     
     if filetype(file_) == "xml":
         nsx.plot_option_to_xml = lambda popt, sel = 0, mod = "update": plot_option_to_xml(nsx, popt, sel, mod)
+        nsx.plot_options_to_xml = lambda changes: plot_options_to_xml(nsx, changes)
     else:
         nsx.plot_option_to_xml = lambda popt, sel = 0, mod = "update": None #since a txt file should not save options
+        nsx.plot_options_to_xml = lambda changes: None
+
+def txt_to_plot(file_, p, reader = None, data = None):
+    """
+    Same as tree_to_plot(txt_to_tree(file_, p), file_), but the columns are read chunk by chunk without a tree. reader and data can be given if txt_to_columns was already called.
+    """
+    if reader == None:
+        reader, data = txt_to_columns(file_, p)
+    nsx = namespace()
+    nsx.file_ = file_
+    nsx.param = reader.param
+    nsx.label = reader.label
+    nsx.data = data
+    set_plot_option(nsx, xml.Element("plot_option", {"file_": file_, "comment": to_str(reader.comment)}))
+    return nsx
+
+def load_plot(file_, p):
+    if filetype(file_) == "txt":
+        return txt_to_plot(file_, p)
+    return tree_to_plot(file_to_tree(file_, p), file_)
+
+memory_size = 0 # > 0 keeps the last memory_size loaded files in memory (used by the plot_server)
+memory = collections.OrderedDict()
+
+def file_to_plot(file_, p):
+    """
+    Same as load_plot(file_, p), but the columns are taken from the column cache if it is valid. The flag nocache bypasses the cache. With memory_size > 0 the namespaces of unchanged files are kept in memory as well.
+    """
+    if "nocache" in p.flag:
+        return load_plot(file_, p)
+    if memory_size <= 0:
+        return cache_to_plot(file_, p)
+    
+    key = (os.path.abspath(file_), stamp(file_), to_str(p.get("comment", None)))
+    if key not in memory:
+        memory[key] = cache_to_plot(file_, p)
+        while len(memory) > memory_size:
+            memory.popitem(last = False)
+    memory.move_to_end(key)
+    return copy.copy(memory[key]) # join_pns relabels the namespace
+
+def cache_to_plot(file_, p):
+    """
+    Loads file_ through the column cache.
+    """
+    folder = cache_folder(file_, p)
+    comment = to_str(make_list(p.get("comment", ["#"]))) if filetype(file_) == "txt" else None # the data of an xml does not depend on it
+    nsx = load_cached(file_, folder, comment)
+    if nsx == None:
+        nsx = load_plot(file_, p)
+        store_cached(file_, nsx, folder, None if p.get("cache_dir") == "local" else p.get("cache_size", cache_size), comment)
+    else:
+        nsx.file_ = file_
+        if filetype(file_) == "xml": # the options change without the data, always read them
+            set_plot_option(nsx, read_plot_option(file_))
+        else:
+            source, plot_option = nsx.source, nsx.plot_option
+            set_plot_option(nsx, None)
+            nsx.source, nsx.plot_option = source, plot_option
     
+    nsx.cache = folder
     return nsx
     
 def xml_to_plot(file_):
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Author:  Mario S. Könz <mskoenz@gmx.net>
+# Date:    18.10.2026 19:02:14 CEST
+# File:    plot_server.py
+
+"""
+Keeps a plot process warm (numpy, sympy, matplotlib, the compiled expressions and the loaded files) and serves plot requests over a unix socket.
+
+    python3 -m addon.plot_server -serve     # start the server
+    python3 -m addon.plot_server -stop      # stop it
+    python3 -m addon.plot_server <plot argv> # same as plot, in the server if one runs, in this process otherwise
+"""
+
+from .helper import *
+from .parameter import *
+
+import os
+import sys
+import json
+import socket
+import importlib
+import contextlib
+
+def socket_path():
+    return os.path.join(os.environ.get("XDG_RUNTIME_DIR", "/tmp"), "addon_plot_{}.sock".format(os.getuid()))
+
+#------------------- protocol: one json line per request and per answer -------------------
+def send_json(conn, obj):
+    conn.sendall((json.dumps(obj) + "\n").encode("utf-8"))
+
+def recv_json(conn):
+    buf = b""
+    while not buf.endswith(b"\n"):
+        block = conn.recv(1 << 16)
+        if not block:
+            break
+        buf += block
+    return json.loads(buf.decode("utf-8")) if buf else None
+
+#------------------- server -------------------
+def plot_module():
+    """
+    The plot package, imported on first use (the client should stay light).
+    """
+    return importlib.import_module(".plot", __package__)
+
+def plot_in(argv, cwd):
+    """
+    Runs plot with argv in the folder cwd, stderr goes to stdout. The rc settings are restored afterwards, s.t. requests do not influence each other.
+    """
+    import matplotlib
+
+    home = os.getcwd()
+    try:
+        with contextlib.redirect_stderr(sys.stdout), matplotlib.rc_context():
+            os.chdir(cwd)
+            p = parameter_class()
+            p.read(["plot"] + argv)
+            plot_module().plot(p)
+    except SystemExit as e: # must not stop the server
+        if e.code not in [None, 0]:
+            ERROR("exit {}".format(e.code))
+    finally:
+        os.chdir(home)
+
+def run_plot(argv, cwd):
+    """
+    Returns (output, error) of plot_in(argv, cwd).
+    """
+    captured = importlib.import_module(".plot.pool", __package__).captured
+    out, res, err = captured(plot_in, argv, cwd)
+    return out, err
+
+def serve(sock_file = None, memory = 32):
+    """
+    Serves plot requests on the unix socket sock_file one after the other (matplotlib is not thread safe) until a stop request arrives. The last memory loaded files are kept in memory.
+    """
+    sock_file = sock_file or socket_path()
+    if client_connect(sock_file) != None:
+        ERROR("a plot server already runs on {}".format(sock_file))
+    if os.path.exists(sock_file): # left over from a server that died
+        if os.stat(sock_file).st_uid != os.getuid():
+            ERROR("{} belongs to another user, set XDG_RUNTIME_DIR".format(sock_file))
+        os.remove(sock_file)
+
+    plot_module() # the warm up, everything is imported here once
+    importlib.import_module(".plot.xml_parser", __package__).memory_size = memory
+
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    umask = os.umask(0o077) # the socket is private from the start
+    try:
+        server.bind(sock_file)
+    finally:
+        os.umask(umask)
+    server.listen(16)
+    GREEN("plot server listening on {greenb}{}".format(sock_file, **color))
+    try:
+        while True:
+            conn, addr = server.accept()
+            with conn:
+                try:
+                    req = recv_json(conn)
+                except ValueError:
+                    req = None
+                if req == None:
+                    continue
+                if req.get("stop", False):
+                    send_json(conn, {"out": "", "err": None})
+                    break
+                out, err = run_plot(req["argv"], req["cwd"])
+                send_json(conn, {"out": out, "err": err})
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+        os.remove(sock_file)
+        GREEN("plot server stopped")
+
+#------------------- client -------------------
+def client_connect(sock_file = None):
+    """
+    Returns a connected socket to the plot server or None if none runs. A socket of another user is not used, the arguments and the folder would go to their process.
+    """
+    sock_file = sock_file or socket_path()
+    try:
+        owner = os.stat(sock_file).st_uid
+    except OSError:
+        return None
+    if owner != os.getuid():
+        WARNING("{} belongs to another user, it is not used".format(sock_file))
+        return None
+    
+    conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        conn.connect(sock_file)
+    except OSError: # no socket file or nobody listens
+        conn.close()
+        return None
+    return conn
+
+def plot_client(argv, sock_file = None):
+    """
+    Drop in replacement for plot on the command line: sends argv to the plot server or, if none runs, plots in this process. Returns the exit code.
+    """
+    conn = client_connect(sock_file)
+    if conn == None:
+        p = parameter_class()
+        p.read(["plot"] + argv)
+        try:
+            plot_module().plot(p)
+        except Exception as e:
+            print(e)
+            return 1
+        return 0
+
+    with conn:
+        send_json(conn, {"argv": argv, "cwd": os.getcwd()})
+        res = recv_json(conn)
+    if res == None:
+        ERROR("the plot server closed the connection")
+    sys.stdout.write(res["out"])
+    if res["err"] != None:
+        print(res["err"])
+        return 1
+    return 0
+
+def stop_server(sock_file = None):
+    conn = client_connect(sock_file)
+    if conn == None:
+        WARNING("no plot server runs")
+        return
+    with conn:
+        send_json(conn, {"stop": True})
+        recv_json(conn)
+
+if __name__ == "__main__":
+    argv = sys.argv[1:]
+    if argv == ["-serve"]:
+        serve()
+    elif argv == ["-stop"]:
+        stop_server()
+    else:
+        sys.exit(plot_client(argv))
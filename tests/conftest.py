@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Author:  Mario S. Könz <mskoenz@gmx.net>
+# Date:    19.10.2026 09:12:31 CEST
+# File:    conftest.py
+
+import os
+import sys
+import atexit
+import shutil
+import tempfile
+
+import pytest
+
+def addon_parent():
+    """
+    Folder from which the repo can be imported as addon. The repo is used as a checkout named addon (see README), otherwise an addon symlink to it is made in a temporary folder.
+    """
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    if os.path.basename(root) == "addon":
+        return os.path.dirname(root)
+    parent = tempfile.mkdtemp(prefix = "addon_test_")
+    atexit.register(shutil.rmtree, parent, True) # only the link, the repo is not followed
+    os.symlink(root, os.path.join(parent, "addon"))
+    return parent
+
+ADDON_PARENT = addon_parent()
+sys.path.insert(0, ADDON_PARENT)
+
+@pytest.fixture
+def addon_env():
+    """
+    Environment for python subprocesses that import addon.
+    """
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join([ADDON_PARENT] + [p for p in [env.get("PYTHONPATH")] if p])
+    return env
@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Author:  Mario S. Könz <mskoenz@gmx.net>
+# Date:    19.10.2026 09:41:17 CEST
+# File:    test_column.py
+
+import numpy as np
+import pytest
+
+hypothesis = pytest.importorskip("hypothesis")
+from hypothesis import given, settings, strategies as st
+
+from addon.helper import to_number
+from addon.plot.column import to_column, tokens_to_column
+
+#------------------- tokens like split_clean gives them -------------------
+int_token = st.integers(-2**70, 2**70).map(str) # beyond int64 on both sides
+float_token = st.floats(allow_nan = True, allow_infinity = True).map(repr)
+edge_token = st.sampled_from(["1_0", "inf", "-inf", "nan", "NaN", "1e5", "+3", "-0", "1.", ".5", "0x10", "True", "٣"
+                            , "'x y'", "\"a\"", "'1'", "[1, 2]", "[1,'a']", "[]", "abc", "1,2", "9223372036854775808"])
+text_token = st.text(alphabet = "0123456789.-+eE_'\"[],abc", min_size = 1, max_size = 6)
+token = st.one_of(int_token, float_token, edge_token, text_token)
+
+column = st.one_of(st.lists(int_token, max_size = 20)
+                 , st.lists(st.one_of(int_token, float_token), max_size = 20)
+                 , st.lists(token, max_size = 20))
+
+def same_column(a, b):
+    if a.dtype != b.dtype or a.shape != b.shape:
+        return False
+    if a.dtype == np.float64:
+        return np.array_equal(a, b, equal_nan = True)
+    return repr(a.tolist()) == repr(b.tolist()) # nan inside object columns
+
+@settings(max_examples = 2000, deadline = None)
+@given(column)
+def test_tokens_to_column_equals_to_number(tokens):
+    assert same_column(tokens_to_column(tokens), to_column(to_number(list(tokens))))
+
+@pytest.mark.parametrize("tokens, dtype", [
+      (["1", "2"], np.int64)
+    , (["1", "2.5"], np.float64)
+    , (["1", "nan"], np.float64)
+    , (["1", "9223372036854775808"], object)
+    , (["1", "'x y'"], object)
+    , ([], np.int64)
+    ])
+def test_tokens_to_column_dtype(tokens, dtype):
+    assert tokens_to_column(tokens).dtype == dtype
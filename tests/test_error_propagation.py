@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Author:  Mario S. Könz <mskoenz@gmx.net>
+# Date:    20.10.2026 09:22:48 CEST
+# File:    test_error_propagation.py
+
+import importlib
+
+import numpy as np
+import pytest
+
+sy = pytest.importorskip("sympy")
+
+ep = importlib.import_module("addon.plot.error_propagation") # addon.plot is the plot function
+from addon.plot.expression_cache import expr_cache_class
+
+data = {
+      "a": np.array([.5, 1., 2.5, 3., 7.25])
+    , "a_err": np.array([.1, .2, .05, .3, .1])
+    , "b": np.array([1., 2., 3., 2.5, .75])
+    , "b_err": np.array([.2, .1, .1, .05, .3])
+    , "c": np.array([1., 4., 2., 3., 5.])
+    }
+
+def row_by_row(data, expr):
+    """
+    The original evaluation: sympy value and error, substituted and evaluated with evalf row by row.
+    """
+    sym = ep.expr_symbols(expr)
+    ns = dict((v, sy.symbols(v, real = True)) for v in sym)
+    ns.update((v + "_err", sy.symbols(v + "_err", positive = True)) for v in sym)
+    val = eval(expr, dict(sy.__dict__), ns)
+    err = sy.sqrt(sum(sy.diff(val, ns[v])**2 * ns[v + "_err"]**2 for v in sym))
+
+    def transform(e):
+        res = []
+        for i in range(len(data["a"])):
+            x = e
+            for k, s in ns.items():
+                x = x.subs(s, data[k][i] if k in data else 0)
+            res.append(float(x.evalf()))
+        return np.array(res)
+
+    return transform(val), transform(err)
+
+@pytest.mark.parametrize("expr", [
+      "gamma(a)"
+    , "erf(b)"
+    , "erfc(b)"
+    , "factorial(b)"
+    , "loggamma(a)"
+    , "besselj(0,a)"
+    , "sign(a)"
+    , "gamma(a)*b + erf(b)/a"
+    , "sign(a-2)*c"
+    , "a*b + sin(c)/a"
+    ])
+def test_functions_like_row_by_row(expr, monkeypatch):
+    monkeypatch.setattr(ep, "expr_cache", expr_cache_class(None))
+    val, err = ep.calc_expr(data, expr, backend = "sympy")
+    ref_val, ref_err = row_by_row(data, expr)
+    assert np.allclose(val, ref_val, rtol = 1e-12, atol = 0)
+    assert np.allclose(np.zeros_like(val) if err is None else err, ref_err, rtol = 1e-12, atol = 1e-300)
+
+def test_cached_sources_compile_without_sympy_objects(monkeypatch):
+    cache = expr_cache_class(None)
+    monkeypatch.setattr(ep, "expr_cache", cache)
+    ep.calc_expr(data, "besselj(0,a) + sign(a)")
+    for key, (keys, src) in [(k, v) for k, v in cache.entries.items() if k[0] in ["fct", "err"]]:
+        assert isinstance(src, str)
+        assert callable(expr_cache_class(None).compile(src))
@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Author:  Mario S. Könz <mskoenz@gmx.net>
+# Date:    19.10.2026 09:14:02 CEST
+# File:    test_import.py
+
+import sys
+import json
+import subprocess
+
+import_budget = 0.5 # s, import addon takes about 0.04s, matplotlib alone would take longer
+
+def run(code, env):
+    """
+    Runs code in a fresh interpreter (nothing imported yet) and returns what it printed as json.
+    """
+    out = subprocess.run([sys.executable, "-c", code], env = env, check = True, stdout = subprocess.PIPE).stdout
+    return json.loads(out.decode("utf-8").splitlines()[-1])
+
+def test_import_is_light(addon_env):
+    res = run("""
+import sys, time, json
+t = time.perf_counter()
+import addon
+t = time.perf_counter() - t
+print(json.dumps({"time": t, "heavy": [m for m in ["matplotlib", "sympy", "numpy"] if m in sys.modules]}))
+""", addon_env)
+    assert res["heavy"] == []
+    assert res["time"] < import_budget
+
+def test_plot_is_the_function(addon_env):
+    for first in ["import addon", "import addon.plot.xml_parser", "import importlib; importlib.import_module('addon.plot')"]:
+        res = run(first + """
+import json, addon
+print(json.dumps([callable(addon.plot), type(addon.plot).__name__]))
+""", addon_env)
+        assert res == [True, "function"], first
+
+def test_star_import(addon_env):
+    res = run("""
+import json
+from addon import *
+print(json.dumps([callable(plot), type(parameter).__name__, callable(split_clean)]))
+""", addon_env)
+    assert res == [True, "parameter_class", True]
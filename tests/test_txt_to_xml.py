@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Author:  Mario S. Könz <mskoenz@gmx.net>
+# Date:    20.10.2026 10:05:12 CEST
+# File:    test_txt_to_xml.py
+
+import os
+import importlib
+import xml.etree.ElementTree as xml
+
+import numpy as np
+import pytest
+
+from addon.helper import namespace
+t2x = importlib.import_module("addon.plot.txt_to_xml") # addon.plot is the plot function
+xp = importlib.import_module("addon.plot.xml_parser")
+
+header = "#comment\n#param L=4 beta=2.5\na b c\n"
+
+def rows(start, n):
+    return "".join("{} {} {}\n".format(i, i * .5, "'x y'" if i % 3 else i) for i in range(start, start + n))
+
+def param(**kw):
+    return namespace(dict({"flag": []}, **kw))
+
+def write(file_, text, mode = "w"):
+    with open(file_, mode) as ofs:
+        ofs.write(text)
+
+def load(file_):
+    nsx = xp.xml_to_plot(str(file_))
+    return nsx.label, nsx.data, nsx.plot_option, nsx.param
+
+def same_data(a, b):
+    if list(a.keys()) != list(b.keys()):
+        return False
+    for k in a:
+        x, y = np.asarray(a[k]), np.asarray(b[k])
+        if x.dtype != y.dtype or repr(x.tolist()) != repr(y.tolist()):
+            return False
+    return True
+
+def assert_like_conversion(txt, dest, tmp_path, **kw):
+    """
+    dest has the same label, parameter and data as a full conversion of txt.
+    """
+    full = str(tmp_path / "full.xml")
+    if os.path.exists(full):
+        os.remove(full)
+    t2x.txt_to_xml(str(txt), full, param(**kw))
+    label, data, opt, par = load(dest)
+    full_label, full_data, full_opt, full_par = load(full)
+    assert label == full_label
+    assert par == full_par
+    assert same_data(data, full_data)
+    assert xml.parse(str(dest)).getroot().find("plot_option").attrib["offset"] == str(os.path.getsize(str(txt)))
+
+#------------------- write_plot_option -------------------
+@pytest.fixture
+def converted(tmp_path):
+    txt = tmp_path / "a.txt"
+    write(txt, header + rows(0, 50))
+    dest = tmp_path / "a.xml"
+    t2x.txt_to_xml(str(txt), str(dest), param())
+    return txt, dest
+
+def data_section(file_):
+    with open(str(file_), "rb") as ifs:
+        text = ifs.read()
+    return text[text.index(b"<parameter"):]
+
+def test_write_plot_option_in_place(converted):
+    txt, dest = converted
+    size = os.path.getsize(str(dest))
+    before = load(dest)
+    tail = data_section(dest)
+
+    nsx = xp.xml_to_plot_option(str(dest))
+    nsx.plot_option_to_xml({"x": "a", "y": "b"}, sel = 1)
+
+    assert os.path.getsize(str(dest)) == size # the padding took the new opt
+    assert data_section(dest) == tail
+    label, data, opt, par = load(dest)
+    assert opt == [{}, {"x": "a", "y": "b"}]
+    assert label == before[0] and par == before[3] and same_data(data, before[1])
+
+def test_write_plot_option_grows(converted):
+    txt, dest = converted
+    size = os.path.getsize(str(dest))
+    before = load(dest)
+    tail = data_section(dest)
+
+    nsx = xp.xml_to_plot_option(str(dest))
+    big = dict(("key{}".format(i), "value {}".format(i) * 10) for i in range(40))
+    nsx.plot_option_to_xml(big, sel = 0)
+
+    assert os.path.getsize(str(dest)) > size # the rest of the file was streamed
+    assert data_section(dest) == tail
+    label, data, opt, par = load(dest)
+    assert opt[0] == big
+    assert label == before[0] and par == before[3] and same_data(data, before[1])
+
+    #------------------- the reserved space takes the next small change -------------------
+    size = os.path.getsize(str(dest))
+    xp.xml_to_plot_option(str(dest)).plot_option_to_xml({"x": "a"}, sel = 1)
+    assert os.path.getsize(str(dest)) == size
+    assert load(dest)[2] == [big, {"x": "a"}]
+    assert data_section(dest) == tail
+
+#------------------- update -------------------
+@pytest.mark.parametrize("encoding", ["text", "base64", "zlib"])
+def test_update_after_append(tmp_path, encoding):
+    txt = tmp_path / "a.txt"
+    write(txt, header + rows(0, 20))
+    dest = tmp_path / "a.xml"
+    t2x.txt_to_xml(str(txt), str(dest), param(encoding = encoding))
+    xp.xml_to_plot_option(str(dest)).plot_option_to_xml({"x": "a"})
+
+    write(txt, rows(20, 15) + "# comment\n\n" + rows(35, 5), "a")
+    opts = t2x.read_plot_option(str(dest))
+    assert t2x.append_txt(str(txt), str(dest), param(), opts) == 20
+    assert t2x.read_data_encoding(str(dest)) == encoding
+    assert load(dest)[2] == [{"x": "a"}] # the options are kept
+    assert_like_conversion(txt, dest, tmp_path, encoding = encoding)
+
+    #------------------- nothing new -------------------
+    assert t2x.append_txt(str(txt), str(dest), param(), t2x.read_plot_option(str(dest))) == 0
+
+def test_update_partial_line(tmp_path):
+    txt = tmp_path / "a.txt"
+    write(txt, header + rows(0, 10) + "10 5.")
+    dest = tmp_path / "a.xml"
+    t2x.txt_to_xml(str(txt), str(dest), param())
+    assert len(load(dest)[1]["a"]) == 10 # the incomplete line is left out
+
+    write(txt, "0 10\n" + rows(11, 3), "a")
+    xp.update_xml(str(dest), param(flag = ["update"]))
+    assert len(load(dest)[1]["a"]) == 14
+    assert_like_conversion(txt, dest, tmp_path)
+
+@pytest.mark.parametrize("change", ["truncate", "rewrite"])
+def test_update_converts_again(tmp_path, change):
+    txt = tmp_path / "a.txt"
+    write(txt, header + rows(0, 30))
+    dest = tmp_path / "a.xml"
+    t2x.txt_to_xml(str(txt), str(dest), param())
+    size = os.path.getsize(str(txt))
+
+    if change == "truncate":
+        write(txt, header + rows(0, 12))
+    else: # same size, other content
+        write(txt, header + rows(0, 30).replace("0.5", "0.7"))
+        assert os.path.getsize(str(txt)) == size
+
+    assert t2x.append_txt(str(txt), str(dest), param(), t2x.read_plot_option(str(dest))) == None
+    xp.update_xml(str(dest), param(flag = ["update"]))
+    assert_like_conversion(txt, dest, tmp_path)